@@ -1,106 +1,361 @@
-from flask import Flask, request, jsonify
+import copy
+import cProfile
+import os
+import time
+from collections import namedtuple
+from functools import wraps
+from itertools import chain, islice
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
 from datetime import datetime, timedelta
+import ical
+from calendars import MAX_CALENDARS, CalendarRegistry, hold
+from jobs import JobConflict, JobRunner
+from json_provider import FastJSONProvider
+from models import MAX_OCCURRENCES, Event, Flexibility, Recurrence, occurrence_id
+from pagination import decode_cursor, encode_cursor
+from slots import BusyTimeline
+from metrics import CONFLICT_CHECKS, REGISTRY, REQUEST_LATENCY, RESCHEDULED_EVENTS, RESPONSE_CACHE
+from solver import PRIORITY_WEIGHTS, Solution, Solver, Task
+from storage import DEFAULT_CALENDAR
+from timeutils import format_datetime, parse_datetime, parse_preferred_time, utc_now
+from weekly_stats import parse_week, start_of_week
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:3000"])
-
-# In-memory event storage
-events = []
-
-#def parse_datetime(date_string):
-#    """Parse datetime string with flexible format handling."""
-#    if not date_string:
-#        return None
-#    try:
-#        # First try with seconds
-#        return datetime.strptime(date_string, "%Y-%m-%dT%H:%M:%S")
-#    except ValueError:
-#        try:
-#            # Then try without seconds
-#            return datetime.strptime(date_string, "%Y-%m-%dT%H:%M")
-#        except ValueError:
-#            raise ValueError(f"Invalid datetime format: {date_string}")
-def parse_datetime(date_string):
-    """Parse datetime string with ISO format handling."""
-    if not date_string:
-        return None
+app.json = FastJSONProvider(app)
+CORS(app, origins=["http://localhost:3000"], expose_headers=["X-Events-Version", "X-Events-Log", "Location"])
 
-    if date_string.endswith('Z'):
-        date_string = date_string[:-1]  
-    if '.' in date_string:
-        date_string = date_string.split('.')[0]  
-        
-    try:
-        return datetime.strptime(date_string, "%Y-%m-%dT%H:%M:%S")
-    except ValueError:
-        try:
-            return datetime.strptime(date_string, "%Y-%m-%dT%H:%M")
-        except ValueError:
-            raise ValueError(f"Invalid datetime format: {date_string}")
-        
-def parse_preferred_time(preferred_time):
-    """Parse preferred time string in format 'HH:MM - HH:MM'."""
-    if not preferred_time:
-        return None, None
+# Calendars are stored in SQLite when SCHEDULER_DB points at a database file, in memory otherwise;
+# SCHEDULER_DATA_DIR keeps memory calendars on disk as snapshots plus an operation log.
+# SCHEDULER_AVAILABILITY=bitmap answers conflict checks, slot search and the placement of new
+# events from NumPy occupancy bitmaps. SCHEDULER_MAX_CALENDARS caps the calendars kept open.
+calendars = CalendarRegistry(
+    os.environ.get("SCHEDULER_DB"),
+    os.environ.get("SCHEDULER_AVAILABILITY"),
+    os.environ.get("SCHEDULER_DATA_DIR"),
+    int(os.environ.get("SCHEDULER_MAX_CALENDARS", MAX_CALENDARS))
+)
+
+# With SCHEDULER_PROFILE_DIR set, requests sending X-Profile get a cProfile dump in that directory.
+PROFILE_DIR = os.environ.get("SCHEDULER_PROFILE_DIR")
+
+# Background jobs (async reschedules) run on SCHEDULER_JOB_WORKERS threads.
+jobs = JobRunner(int(os.environ.get("SCHEDULER_JOB_WORKERS", 2)), logger=app.logger)
+
+# The requested calendar's event store, change log and weekly statistics
+store = LocalProxy(lambda: g.calendar.store)
+changes = LocalProxy(lambda: g.calendar.changes)
+stats = LocalProxy(lambda: g.calendar.stats)
+
+# GET /events paging limits and the open-ended bounds of a half-given range
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+RANGE_MIN = datetime(1970, 1, 1)
+RANGE_MAX = datetime(9999, 1, 1)
+MAX_BATCH_SIZE = 10000
+# iCalendar imports are scheduled this many events per transaction and report
+# at most MAX_IMPORT_ERRORS of the events they could not create
+IMPORT_CHUNK_SIZE = 5000
+MAX_IMPORT_ERRORS = 100
+MAX_FREEBUSY_CALENDARS = 500
+# Weeks one /statistics range may span, about ten years
+MAX_STATISTICS_WEEKS = 520
+DEFAULT_SOLVER_BUDGET_MS = 1000
+MAX_SOLVER_BUDGET_MS = 30000
+RESCHEDULE_JOB_ATTEMPTS = 3
+# Localized re-planning on insert and delete: neighborhood size, time budget and
+# how far after a freed gap to look for events to pull into it
+MAX_REPLAN_EVENTS = 200
+REPLAN_BUDGET_MS = 50
+REPLAN_HORIZON = timedelta(days=7)
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+# Fields each event type needs besides title and priority
+EVENT_TYPE_FIELDS = {
+    "fixed": ["start", "end"],
+    "recurring_with_preferred_time": ["duration", "frequency", "start_date"],
+    "recurring_without_preferred_time": ["duration", "frequency", "start_date"],
+    "flexible_with_preferred_time": ["duration", "earliest_start", "deadline"],
+    "flexible_without_preferred_time": ["duration", "earliest_start", "deadline"]
+}
+
+# What a reschedule releases: events to place again (copies), occurrence
+# indexes per series, stored ids to remove, the ids of stored series instances
+# by (parent id, occurrence, start, end), the busy time that stays and the
+# (start, end) range it covers
+ReleasedWindow = namedtuple("ReleasedWindow", "events occurrences removals instances timeline span")
+
+@app.before_request
+def start_instrumentation():
+    """Start the request's latency timer and, if asked for, its profiler."""
+    if REGISTRY.enabled:
+        g.request_started = time.perf_counter()
+    if PROFILE_DIR and request.headers.get("X-Profile"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def finish_instrumentation(response):
+    """Record the request's latency and dump its profile, if any."""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        path = os.path.join(
+            PROFILE_DIR, f"{datetime.now():%Y%m%dT%H%M%S%f}-{request.endpoint or 'unmatched'}.prof"
+        )
+        profiler.dump_stats(path)
+        response.headers["X-Profile-File"] = path
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started, (request.method, endpoint, str(response.status_code))
+        )
+    return response
+
+@app.before_request
+def select_calendar():
+    """Pick the calendar named by the X-Calendar-Id header or calendar parameter.
+
+    Only requests that may write create the calendar; /freebusy works on the
+    calendars it lists instead.
+    """
+    calendar_id = (
+        request.headers.get("X-Calendar-Id") or request.args.get("calendar") or DEFAULT_CALENDAR
+    )
+    create = request.method not in ("GET", "HEAD", "OPTIONS") and request.endpoint != "free_busy"
     try:
-        start_time, end_time = preferred_time.split("-")
-        start = datetime.strptime(start_time.strip(), "%H:%M").time()
-        end = datetime.strptime(end_time.strip(), "%H:%M").time()
-        return start, end
-    except (ValueError, AttributeError):
-        raise ValueError(f"Invalid preferred time format: {preferred_time}")
+        g.calendar = calendars.get(calendar_id, create)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+
+def reads_store(view):
+    """Run a view under the store's shared lock; reads do not block each other."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with store.reading():
+            return view(*args, **kwargs)
+    return wrapper
+
+def writes_store(view):
+    """Run a view as one store transaction so its checks and writes are atomic."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with store.transaction():
+            return view(*args, **kwargs)
+    return wrapper
+
+def cached_response(variant=None):
+    """Serve a read view from the calendar's response cache, with strong ETags.
+
+    The ETag is the calendar's version, which every mutation bumps (in any
+    worker, for SQLite), so a request whose If-None-Match holds the current
+    one gets a 304 without the view running, and other requests for a URL
+    already served at this version get the cached body. A response is only
+    tagged and cached if the version did not move while it was built.
+    ``variant`` returns whatever else the response depends on, such as the
+    current week.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            calendar = g.calendar
+            version = calendar.version()
+            etag = version
+            extra = variant() if variant is not None else ""
+            if extra:
+                etag += f"-{extra}"
+            if request.if_none_match.contains_weak(etag):
+                RESPONSE_CACHE.inc(labels=("not_modified",))
+                return revalidated(Response(status=304), etag)
+            key = request.full_path
+            cached = calendar.responses.get(key, etag)
+            if cached is not None:
+                RESPONSE_CACHE.inc(labels=("hit",))
+                return revalidated(Response(cached[0], headers=cached[1]), etag)
+            RESPONSE_CACHE.inc(labels=("miss",))
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            if calendar.version() != version:
+                # Written to meanwhile: the body may not be the one this ETag names
+                return response
+            headers = [(name, value) for name, value in response.headers if name != "Content-Length"]
+            calendar.responses.put(key, etag, response.get_data(), headers)
+            return revalidated(response, etag)
+        return wrapper
+    return decorator
+
+def revalidated(response, etag):
+    """Tag a cacheable response so clients revalidate it on every use."""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("X-Calendar-Id")
+    return response
 
 @app.route("/events", methods=["GET"])
+@cached_response()
+@reads_store
 def get_events():
-    """Fetch all events."""
-    return jsonify(events)
-@app.route("/events/<int:event_id>", methods=["DELETE"])
+    """Fetch events, optionally within a time range, paginated or streamed.
+
+    ``start``/``end`` select the events overlapping that range, ``limit`` and
+    ``cursor`` page through the results, and ``stream=ndjson`` or
+    ``stream=json`` streams every matching event in batches. Occurrences of
+    recurring series are generated for ranged queries only; without a range
+    the stored events are listed, recurring parents with their rule.
+    """
+    try:
+        range_start = parse_datetime(request.args.get("start"))
+        range_end = parse_datetime(request.args.get("end"))
+        ranged = range_start is not None or range_end is not None
+        after = decode_cursor(request.args.get("cursor"), ranged)
+        limit = int(request.args.get("limit", MAX_PAGE_SIZE))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if ranged:
+        range_start = range_start or RANGE_MIN
+        range_end = range_end or RANGE_MAX
+
+    def fetch(after, limit):
+        if ranged:
+            return store.page(range_start, range_end, after, limit)
+        return store.all(after, limit)
+
+    # Clients resume delta sync from the version their listing was taken at
+    version_headers = {"X-Events-Version": str(changes.version), "X-Events-Log": changes.log_id}
+
+    stream = request.args.get("stream")
+    if stream in ("ndjson", "json"):
+        return Response(
+            stream_with_context(stream_events(fetch, ranged, after, ndjson=stream == "ndjson")),
+            mimetype="application/x-ndjson" if stream == "ndjson" else "application/json",
+            headers=version_headers
+        )
+
+    if "limit" not in request.args and "cursor" not in request.args:
+        return jsonify([event.to_dict() for event in fetch(after, None)]), 200, version_headers
+
+    page = fetch(after, limit)
+    next_cursor = encode_cursor(page[-1], ranged) if len(page) == limit else None
+    return jsonify({
+        "events": [event.to_dict() for event in page],
+        "next_cursor": next_cursor
+    }), 200, version_headers
+
+@app.route("/events/changes", methods=["GET"])
+@reads_store
+def get_event_changes():
+    """Return the changes made after the client's last synced version."""
+    try:
+        since = int(request.args.get("since", ""))
+    except ValueError:
+        return jsonify({"error": "since must be an integer version"}), 400
+
+    log_id = request.args.get("log")
+    deltas = changes.since(since) if log_id in (None, changes.log_id) else None
+    if deltas is None:
+        # The log no longer covers that version; the client must refetch everything
+        return jsonify({"version": changes.version, "log": changes.log_id, "resync": True})
+    return jsonify({
+        "version": changes.version,
+        "log": changes.log_id,
+        "resync": False,
+        "changes": deltas
+    })
+
+def stream_events(fetch, ranged, after=None, ndjson=True):
+    """Yield serialized events batch by batch so no full response is built in memory."""
+    separator = "\n" if ndjson else ","
+    if not ndjson:
+        yield "["
+    first = True
+    while True:
+        # The response outlives the view, so each batch takes the read lock itself
+        with store.reading():
+            batch = fetch(after, STREAM_BATCH_SIZE)
+            chunk = separator.join(app.json.dumps(event.to_dict()) for event in batch)
+        if batch:
+            if ndjson:
+                yield chunk + "\n"
+            else:
+                yield chunk if first else "," + chunk
+            first = False
+        if len(batch) < STREAM_BATCH_SIZE:
+            break
+        last = batch[-1]
+        after = (last.start, last.id) if ranged else last.id
+    if not ndjson:
+        yield "]"
+
+@app.route("/events/<int(signed=True):event_id>", methods=["DELETE"])
+@writes_store
 def delete_event(event_id):
     """Delete an event and its recurring instances if applicable."""
-    # Find the event by ID
-    event_to_delete = None
-    for event in events[:]:  # Create a copy of the list to safely modify it
-        if event.get("id") == event_id:
-            event_to_delete = event
-            events.remove(event)
-            break
+    event_to_delete = store.remove(event_id)
     
     if not event_to_delete:
         return jsonify({"error": "Event not found"}), 404
         
     # If it's a recurring parent event, delete all its instances
-    if event_to_delete["type"].startswith("recurring"):
-        for event in events[:]:  # Create a copy of the list to safely modify it
-            if event.get("type") == "recurring_instance" and event.get("parent_id") == event_id:
-                events.remove(event)
-                
-    return jsonify({"message": "Event deleted successfully"}), 200
+    if event_to_delete.type.startswith("recurring"):
+        for event in store.children(event_id):
+            store.remove(event.id)
+    
+    # A deleted moved occurrence must not reappear at its nominal slot
+    if event_id > 0 and event_to_delete.occurrence is not None:
+        parent = store.get(event_to_delete.parent_id)
+        if parent and parent.recurrence:
+            parent.recurrence.skipped.add(event_to_delete.occurrence)
+            store.add(parent)
+    
+    body = {"message": "Event deleted successfully"}
+    if event_to_delete.is_timed:
+        moved = fill_gap(event_to_delete.start, event_to_delete.end)
+        if moved:
+            body["moved"] = [event.to_dict() for event in moved]
+    return jsonify(body), 200
+
 @app.route("/events", methods=["POST"])
+@writes_store
 def create_event():
     """Create a new event with conflict checking."""
     data = request.json
     event_type = data.get("type", "fixed")
+    if not is_event_type(event_type):
+        return jsonify({"error": f"Unknown event type: {event_type}"}), 400
     
     # Validate required fields based on event type
     if not validate_event_data(data, event_type):
         return jsonify({"error": "Missing required fields"}), 400
+    try:
+        validate_preferred_time(data, event_type)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    new_event = {
-        "id": len(events) + 1,
-        "title": data["title"],
-        "priority": data["priority"],
-        "type": event_type
-    }
+    new_event = Event(
+        id=store.next_id(),
+        title=data["title"],
+        priority=data["priority"],
+        type=event_type
+    )
+    moved = []
 
     if event_type == "fixed":
-        new_event.update({
-            "start": data["start"],
-            "end": data["end"]
-        })
+        try:
+            new_event.start = parse_datetime(data["start"])
+            new_event.end = parse_datetime(data["end"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         if check_conflicts(new_event):
-            return jsonify({"error": "Time slot is occupied"}), 409
-        events.append(new_event)
+            moved = make_room_for(new_event)
+            if moved is None:
+                return jsonify({"error": "Time slot is occupied"}), 409
+        store.add(new_event)
         
     elif event_type.startswith("recurring"):
         success = handle_recurring_event(data, new_event)
@@ -109,252 +364,523 @@ def create_event():
             
     elif event_type.startswith("flexible"):
         success = handle_flexible_event(data, new_event)
+        if not success and new_event.flexibility is not None:
+            moved = make_room_for(new_event)
+            success = moved is not None
         if not success:
             return jsonify({"error": "Could not schedule flexible event"}), 409
     
-    return jsonify(new_event), 201
+    body = new_event.to_dict()
+    if moved:
+        body["moved"] = [event.to_dict() for event in moved]
+    return jsonify(body), 201
 
-def validate_event_data(data, event_type):
-    """Validate required fields based on event type."""
-    base_fields = ["title", "priority"]
+@app.route("/events/batch", methods=["POST"])
+@writes_store
+def create_events_batch():
+    """Create many events in one scheduling pass; see schedule_batch."""
+    data = request.json or {}
+    items = data.get("events")
+    if not isinstance(items, list):
+        return jsonify({"error": "events must be a list"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} events per batch"}), 400
+    
+    body = schedule_batch(items, bool(data.get("atomic")))
+    return jsonify(body), 200 if body["committed"] else 409
+
+def schedule_batch(items, atomic=False):
+    """Create the events of a batch and return the batch response body.
+
+    Fixed events are placed first, then flexible and recurring events by
+    priority, all against one busy timeline. With ``atomic`` set, nothing is
+    stored unless every event could be created. Call within a transaction.
+    """
+    results = [None] * len(items)
+    planned = []
+    bounds = []
+    for index, item in enumerate(items):
+        event_type = item.get("type", "fixed") if isinstance(item, dict) else None
+        if isinstance(item, dict) and not is_event_type(event_type):
+            results[index] = {"status": 400, "error": f"Unknown event type: {event_type}"}
+            continue
+        if event_type is None or not validate_event_data(item, event_type):
+            results[index] = {"status": 400, "error": "Missing required fields"}
+            continue
+        try:
+            new_event, window_start, window_end = plan_batch_event(item, event_type)
+        except ValueError as e:
+            results[index] = {"status": 400, "error": str(e)}
+            continue
+        planned.append((index, item, new_event))
+        bounds += [window_start, window_end]
+    
+    # Fixed events claim their slots first, the rest go by priority
+    planned.sort(key=lambda plan: (
+        plan[2].type != "fixed",
+        PRIORITY_ORDER.get(plan[2].priority, len(PRIORITY_ORDER))
+    ))
+    timeline = build_timeline(min(bounds), max(bounds)) if bounds else None
+    pending = []
+    
+    for index, item, new_event in planned:
+        if new_event.type == "fixed":
+            success = timeline.is_free(new_event.start, new_event.end)
+            if success:
+                timeline.add(new_event.start, new_event.end)
+                pending.append(new_event)
+            error = "Time slot is occupied"
+        elif new_event.recurrence is not None:
+            indexes = list(range(new_event.recurrence.count))
+            success = schedule_occurrences(new_event, indexes, timeline, pending.append) > 0
+            if success:
+                pending.append(new_event)
+            error = "Could not schedule recurring event"
+        else:
+            success = handle_flexible_event(item, new_event, timeline, pending.append)
+            error = "Could not schedule flexible event"
+        
+        if success:
+            results[index] = {"status": 201, "event": new_event.to_dict()}
+        else:
+            results[index] = {"status": 409, "error": error}
     
-    type_fields = {
-        "fixed": ["start", "end"],
-        "recurring_with_preferred_time": ["duration", "frequency", "start_date"],
-        "recurring_without_preferred_time": ["duration", "frequency", "start_date"],
-        "flexible_with_preferred_time": ["duration", "earliest_start", "deadline"],
-        "flexible_without_preferred_time": ["duration", "earliest_start", "deadline"]
+    failed = sum(1 for result in results if result["status"] != 201)
+    committed = not (atomic and failed)
+    if committed:
+        for event in pending:
+            store.add(event)
+    else:
+        for result in results:
+            if result["status"] == 201:
+                result.update(status=424, error="Not created, another event in the batch failed")
+                del result["event"]
+    
+    return {
+        "committed": committed,
+        "created": len(results) - failed if committed else 0,
+        "failed": failed,
+        "results": results
     }
+
+@app.route("/events.ics", methods=["GET"])
+def export_ics():
+    """Stream the calendar's events as an iCalendar file.
+
+    Recurring series are written once, with their rule as an RRULE; of their
+    occurrences only the moved ones are written, as overrides of the series.
+    """
+    calendar_id = g.calendar.id
+    stamp = ical.format_utc(utc_now())
+
+    def generate():
+        yield ical.calendar_header(calendar_id)
+        after = None
+        while True:
+            # Like stream_events, each batch takes the read lock itself
+            with store.reading():
+                batch = store.all(after, STREAM_BATCH_SIZE)
+                chunk = "".join(ics_event(event, calendar_id, stamp) for event in batch)
+            yield chunk
+            if len(batch) < STREAM_BATCH_SIZE:
+                break
+            after = batch[-1].id
+        yield ical.calendar_footer()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/calendar",
+        headers={"Content-Disposition": f'attachment; filename="{calendar_id}.ics"'}
+    )
+
+def ics_uid(calendar_id, event_id):
+    return f"{calendar_id}-{event_id}@smart-scheduler"
+
+def ics_event(event, calendar_id, stamp):
+    """Serialize a stored event as a VEVENT; untimed events give nothing."""
+    rule = event.recurrence
+    if rule is not None:
+        # Occurrences that are not at their nominal slot, unless written as overrides
+        moved = {instance.occurrence for instance in store.children(event.id)}
+        excluded = sorted(rule.skipped | (rule.displaced - moved))
+        return ical.vevent(
+            event, ics_uid(calendar_id, event.id), stamp,
+            excluded=[rule.nominal_slot(index)[0] for index in excluded]
+        )
+    if not event.is_timed:
+        return ""
+    parent = store.get(event.parent_id) if event.parent_id is not None else None
+    if parent is not None and parent.recurrence is not None and event.occurrence is not None:
+        return ical.vevent(
+            event, ics_uid(calendar_id, parent.id), stamp,
+            recurrence_id=parent.recurrence.nominal_slot(event.occurrence)[0]
+        )
+    return ical.vevent(event, ics_uid(calendar_id, event.id), stamp)
+
+@app.route("/import/ics", methods=["POST"])
+def import_ics():
+    """Import the events of an iCalendar file.
+
+    The body is parsed as it arrives and its events are scheduled through
+    the batch path IMPORT_CHUNK_SIZE at a time, one transaction per chunk,
+    so neither the file nor its events are held in memory at once. Daily and
+    weekly series keep their RRULE and EXDATEs; an override of one of their
+    occurrences (RECURRENCE-ID) replaces it with a fixed event.
+    """
+    summary = {"imported": 0, "failed": 0, "errors": []}
+    series = {}
+    overrides = {}
+    chunk = []
+    for properties in ical.read_vevents(request.stream):
+        chunk.append(properties)
+        if len(chunk) == IMPORT_CHUNK_SIZE:
+            import_chunk(chunk, series, overrides, summary)
+            chunk = []
+    if chunk:
+        import_chunk(chunk, series, overrides, summary)
+    return jsonify(summary), 200
+
+def import_chunk(chunk, series, overrides, summary):
+    """Schedule a chunk of parsed VEVENTs and add the outcome to the import summary.
+
+    ``series`` maps the UID of every series imported so far to its parent's
+    id and ``overrides`` the UIDs of series not seen yet to the occurrences
+    already overridden, so overrides and series can come in any order.
+    """
+    def fail(uid, error):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+            summary["errors"].append({"uid": uid, "error": error})
+
+    items = []
+    infos = []
+    for properties in chunk:
+        try:
+            item, info = ical.vevent_item(properties)
+        except Exception as e:
+            # One malformed event must not abort the rest of the file
+            fail(properties.get("UID", [(None, None)])[0][1], str(e) or type(e).__name__)
+            continue
+        items.append(item)
+        infos.append(info)
+
+    with store.transaction():
+        # Free the slots of occurrences overridden here, of series imported before
+        for info in infos:
+            if info.recurrence_id is not None and info.uid in series:
+                skip_occurrence(series[info.uid], info.recurrence_id)
+        results = schedule_batch(items)["results"]
+        created = []
+        for item, info, result in zip(items, infos, results):
+            if result["status"] != 201:
+                fail(info.uid, result["error"])
+                continue
+            summary["imported"] += 1
+            if info.uid is None:
+                continue
+            if info.recurrence_id is not None:
+                if info.uid not in series:
+                    overrides.setdefault(info.uid, []).append(info.recurrence_id)
+            elif item["type"].startswith("recurring"):
+                created.append((info, result["event"]["id"]))
+        for info, parent_id in created:
+            series[info.uid] = parent_id
+            for moment in info.exdates + overrides.pop(info.uid, []):
+                skip_occurrence(parent_id, moment)
+
+def skip_occurrence(parent_id, moment):
+    """Remove the occurrence of a series nominally starting at moment, moved or not."""
+    parent = store.get(parent_id)
+    rule = parent.recurrence if parent is not None else None
+    if rule is None:
+        return
+    offset = moment - rule.nominal_slot(0)[0]
+    period = timedelta(days=rule.frequency)
+    index = offset // period
+    if offset % period or not 0 <= index < rule.count or index in rule.skipped:
+        return
+    if index not in rule.displaced:
+        store.remove(occurrence_id(parent_id, index))
+        return
+    for instance in store.children(parent_id):
+        if instance.occurrence == index:
+            store.remove(instance.id)
+    rule.displaced.discard(index)
+    rule.skipped.add(index)
+    store.add(parent)
+
+def plan_batch_event(data, event_type):
+    """Build the event for a batch item and the window it will be placed in.
+
+    Raises ValueError for items that cannot be parsed.
+    """
+    validate_preferred_time(data, event_type)
+    new_event = Event(
+        id=store.next_id(),
+        title=data["title"],
+        priority=data["priority"],
+        type=event_type
+    )
+    
+    if event_type == "fixed":
+        new_event.start = parse_datetime(data["start"])
+        new_event.end = parse_datetime(data["end"])
+        return new_event, new_event.start, new_event.end
     
-    required_fields = base_fields + type_fields.get(event_type, [])
+    if event_type.startswith("recurring"):
+        rule = new_event.recurrence = parse_recurrence(data)
+        return (
+            new_event,
+            rule.day(0).replace(hour=0, minute=0, second=0),
+            rule.day(rule.count - 1).replace(hour=23, minute=59, second=59)
+        )
+    
+    if event_type.startswith("flexible"):
+        int(data["duration"])
+        return new_event, parse_datetime(data["earliest_start"]), parse_datetime(data["deadline"])
+    
+    raise ValueError(f"Unsupported event type: {event_type}")
+
+def validate_event_data(data, event_type):
+    """Validate required fields based on event type."""
+    base_fields = ["title", "priority"]
+    required_fields = base_fields + EVENT_TYPE_FIELDS[event_type]
     return all(field in data and data[field] for field in required_fields)
 
+def validate_preferred_time(data, event_type):
+    """Raise ValueError if the type places by a preferred time and the one given does not parse."""
+    if event_type.endswith("_with_preferred_time"):
+        parse_preferred_time(data.get("preferred_time"))
+
+def is_event_type(event_type):
+    return isinstance(event_type, str) and event_type in EVENT_TYPE_FIELDS
+
 def check_conflicts(new_event):
     """Check if the new event conflicts with existing events."""
-    new_start = parse_datetime(new_event["start"])
-    new_end = parse_datetime(new_event["end"])
-    
-    if not new_start or not new_end:
+    CONFLICT_CHECKS.inc()
+    if not new_event.is_timed:
         return True
 
-    for event in events:
-        if "start" not in event or "end" not in event:
-            continue
-            
-        event_start = parse_datetime(event["start"])
-        event_end = parse_datetime(event["end"])
-        
-        if event_start and event_end:
-            if max(new_start, event_start) < min(new_end, event_end):
-                return True
-    return False
+    if g.calendar.availability is not None:
+        return g.calendar.availability.occupied(new_event.start, new_event.end)
+    return store.overlaps(new_event.start, new_event.end)
 
-def handle_recurring_event(data, new_event):
-    """Handle recurring event scheduling."""
-    duration = timedelta(minutes=int(data["duration"]))
-    frequency = int(data["frequency"])
-    start_date = parse_datetime(data.get("start_date"))
-    
-    if not start_date:
-        return False
+def busy_intervals(calendar, start_time, end_time):
+    """Sorted busy intervals of a calendar inside the given range, from its bitmap if it has one."""
+    if calendar.availability is not None:
+        return calendar.availability.busy(start_time, end_time)
+    return calendar.store.intervals(start_time, end_time)
+
+def build_timeline(start_time, end_time):
+    """Merge the busy intervals inside the given range into a slot timeline."""
+    return BusyTimeline(busy_intervals(g.calendar, start_time, end_time))
+
+def slot_step(interval_minutes):
+    """Grid step for slot starts; None or 0 means no alignment."""
+    return timedelta(minutes=interval_minutes) if interval_minutes else None
+
+def preferred_windows(earliest_start, deadline, preferred_time):
+    """The daily preferred time windows inside [earliest_start, deadline)."""
+    return parse_preferred_time(preferred_time).between(earliest_start, deadline)
+
+def find_available_slots(start_time, end_time, duration, limit=None, interval_minutes=15,
+                         preferred_time=None):
+    """List available time slots within the given range, earliest first.
+
+    With preferred_time only slots inside that daily window are listed.
+    """
+    step = slot_step(interval_minutes)
+    if g.calendar.availability is not None:
+        starts = g.calendar.availability.feasible_starts(
+            start_time, end_time, duration, step, preferred_time, limit
+        )
+        return [(start, start + duration) for start in starts]
     
-    # Schedule for 30 days from the start date
-    end_date = start_date + timedelta(days=30)
-    
-    scheduled_instances = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        if data.get("type") == "recurring_with_preferred_time" and data.get("preferred_time"):
-            try:
-                pref_start, pref_end = parse_preferred_time(data["preferred_time"])
-                
-                # Try to schedule within preferred time
-                day_start = datetime.combine(current_date.date(), pref_start)
-                day_end = datetime.combine(current_date.date(), pref_end)
-            except ValueError as e:
-                print(f"Error parsing preferred time: {e}")
-                return False
-        else:
-            # For recurring_without_preferred_time, try whole day
-            day_start = current_date.replace(hour=0, minute=0, second=0)
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-        
-        slot = find_available_slot(day_start, day_end, duration)
-        if slot:
-            instance = {
-                "id": len(events) + len(scheduled_instances) + 1,
-                "title": data["title"],
-                "priority": data["priority"],
-                "type": "recurring_instance",
-                "start": slot[0].isoformat(),
-                "end": slot[1].isoformat(),
-                "parent_id": new_event["id"]
-            }
-            scheduled_instances.append(instance)
-        
-        current_date += timedelta(days=frequency)
+    timeline = build_timeline(start_time, end_time)
+    if not preferred_time:
+        return timeline.find_slots(start_time, end_time, duration, step, limit=limit)
+    slots = (
+        slot
+        for window_start, window_end in preferred_windows(start_time, end_time, preferred_time)
+        for slot in timeline.iter_slots(window_start, window_end, duration, step, anchor=start_time)
+    )
+    return list(islice(slots, limit))
+
+@app.route("/slots", methods=["GET"])
+@reads_store
+def get_slots():
+    """List free slots of ``duration`` minutes between ``start`` and ``end``.
+
+    ``preferred_time`` keeps the slots inside that daily window, ``interval``
+    sets the grid of start times in minutes (default 15) and ``limit`` caps
+    the number returned.
+    """
+    try:
+        start_time = parse_datetime(request.args.get("start"))
+        end_time = parse_datetime(request.args.get("end"))
+        duration = int(request.args.get("duration", 0))
+        interval = int(request.args.get("interval", 15))
+        limit = int(request.args.get("limit", MAX_PAGE_SIZE))
+        if not start_time or not end_time or duration < 1 or interval < 0:
+            raise ValueError("start, end and a positive duration are required")
+        slots = find_available_slots(
+            start_time, end_time, timedelta(minutes=duration),
+            max(1, min(limit, MAX_PAGE_SIZE)), interval, request.args.get("preferred_time")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    if scheduled_instances:
-        events.extend(scheduled_instances)
-        return True
-    return False
+    return jsonify({
+        "slots": [
+            {"start": format_datetime(slot_start), "end": format_datetime(slot_end)}
+            for slot_start, slot_end in slots
+        ]
+    })
+
+@app.route("/freebusy", methods=["POST"])
+def free_busy():
+    """Find the time every listed calendar is free, and optionally book a meeting there.
 
-def handle_recurring_event(event_data, new_event):
-    """Handle recurring event scheduling."""
+    ``duration`` (minutes) drops free windows that are too short. A ``book``
+    object (title, priority, optional preferred_time) places a fixed event
+    in the earliest common slot, preferring the preferred window, on all
+    calendars at once.
+    """
+    data = request.json or {}
+    calendar_ids = data.get("calendars")
+    if not isinstance(calendar_ids, list) or not calendar_ids:
+        return jsonify({"error": "calendars must be a non-empty list"}), 400
+    if len(calendar_ids) > MAX_FREEBUSY_CALENDARS:
+        return jsonify({"error": f"At most {MAX_FREEBUSY_CALENDARS} calendars per query"}), 400
     try:
-        duration = timedelta(minutes=int(event_data.get("duration", 0)))
-        frequency = int(event_data.get("frequency", 1))
-        start_date = datetime.now()  # Use current time for rescheduling
-        
-        end_date = start_date + timedelta(days=30)
-        scheduled_instances = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            day_start = current_date.replace(hour=0, minute=0, second=0)
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-            
-            if event_data.get("type") == "recurring_with_preferred_time" and event_data.get("preferred_time"):
-                try:
-                    pref_start, pref_end = parse_preferred_time(event_data["preferred_time"])
-                    day_start = datetime.combine(current_date.date(), pref_start)
-                    day_end = datetime.combine(current_date.date(), pref_end)
-                except ValueError:
-                    return False
-            
-            slot = find_available_slot(day_start, day_end, duration)
-            if slot:
-                instance = {
-                    "id": len(events) + len(scheduled_instances) + 1,
-                    "title": event_data["title"],
-                    "priority": event_data["priority"],
-                    "type": "recurring_instance",
-                    "start": slot[0].isoformat(),
-                    "end": slot[1].isoformat(),
-                    "parent_id": new_event["id"]
-                }
-                scheduled_instances.append(instance)
-            current_date += timedelta(days=frequency)
-        
-        if scheduled_instances:
-            events.extend(scheduled_instances)
-            return True
-        return False
-    except (KeyError, ValueError, TypeError):
-        return False
+        start_time = parse_datetime(data.get("start"))
+        end_time = parse_datetime(data.get("end"))
+        duration = timedelta(minutes=int(data.get("duration", 0)))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not start_time or not end_time or end_time <= start_time:
+        return jsonify({"error": "Invalid date range"}), 400
     
-def handle_flexible_event(data, new_event):
-    """Handle flexible event scheduling."""
-    duration = timedelta(minutes=int(data["duration"]))
-    earliest_start = parse_datetime(data["earliest_start"])
-    deadline = parse_datetime(data["deadline"])
+    booking = data.get("book")
+    if booking is not None:
+        if not isinstance(booking, dict) or not booking.get("title") or not booking.get("priority") or not duration:
+            return jsonify({"error": "Booking needs title, priority and a duration"}), 400
     
-    if not earliest_start or not deadline:
-        return False
+    # Only a booking creates the calendars it writes to
+    try:
+        attendees = [
+            calendars.get(str(calendar_id), booking is not None) for calendar_id in dict.fromkeys(calendar_ids)
+        ]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    
+    with hold(attendees, write=booking is not None):
+        timeline = BusyTimeline.union(
+            *(busy_intervals(calendar, start_time, end_time) for calendar in attendees)
+        )
+        body = {
+            "calendars": [calendar.id for calendar in attendees],
+            "busy": [
+                {"start": format_datetime(busy_start), "end": format_datetime(busy_end)}
+                for busy_start, busy_end in timeline.busy(start_time, end_time)
+            ],
+            "free": [
+                {"start": format_datetime(gap_start), "end": format_datetime(gap_end)}
+                for gap_start, gap_end in timeline.gaps(start_time, end_time)
+                if gap_end - gap_start >= duration
+            ]
+        }
+        if booking is None:
+            return jsonify(body)
         
-    if data.get("type") == "flexible_with_preferred_time" and data.get("preferred_time"):
         try:
-            pref_start, pref_end = parse_preferred_time(data["preferred_time"])
-            
-            # Try to find a slot within preferred time windows
-            current_date = earliest_start.date()
-            while current_date <= deadline.date():
-                day_start = max(
-                    datetime.combine(current_date, pref_start),
-                    earliest_start if current_date == earliest_start.date() else datetime.min
-                )
-                day_end = min(
-                    datetime.combine(current_date, pref_end),
-                    deadline if current_date == deadline.date() else datetime.max
-                )
-                
-                slot = find_available_slot(day_start, day_end, duration)
-                if slot:
-                    new_event.update({
-                        "start": slot[0].isoformat(),
-                        "end": slot[1].isoformat()
-                    })
-                    events.append(new_event)
-                    return True
-                    
-                current_date += timedelta(days=1)
+            slot = find_preferred_slot(
+                timeline, start_time, end_time, duration, booking.get("preferred_time")
+            )
         except ValueError as e:
-            print(f"Error parsing preferred time: {e}")
-            return False
-    else:
-        # Try to find any available slot
-        slot = find_available_slot(earliest_start, deadline, duration)
-        if slot:
-            new_event.update({
-                "start": slot[0].isoformat(),
-                "end": slot[1].isoformat()
-            })
-            events.append(new_event)
-            return True
-            
-    return False
-
-def find_available_slot(start_time, end_time, duration, interval_minutes=15):
-    """Find an available time slot within the given range."""
-    current_time = start_time
-    
-    while current_time + duration <= end_time:
-        proposed_event = {
-            "start": current_time.isoformat(),
-            "end": (current_time + duration).isoformat()
-        }
+            return jsonify({"error": str(e)}), 400
+        if not slot:
+            return jsonify({"error": "No common free slot"}), 409
         
-        if not check_conflicts(proposed_event):
-            return current_time, current_time + duration
-            
-        current_time += timedelta(minutes=interval_minutes)
-    
-    return None
+        booked = {}
+        for calendar in attendees:
+            event = Event(
+                id=calendar.store.next_id(),
+                title=booking["title"],
+                priority=booking["priority"],
+                type="fixed",
+                start=slot[0],
+                end=slot[1]
+            )
+            calendar.store.add(event)
+            booked[calendar.id] = event.to_dict()
+        body["booked"] = booked
+        return jsonify(body), 201
+
+def current_week():
+    """What a /statistics response depends on besides the store: the week it defaults to."""
+    if "week" in request.args or "range" in request.args:
+        return ""
+    return start_of_week(utc_now()).date().isoformat()
 
 @app.route("/statistics", methods=["GET"])
+@cached_response(current_week)
+@reads_store
 def get_statistics():
-    """Get event statistics for the current week."""
-    today = datetime.now()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=7)
-    
-    week_events = []
-    for event in events:
-        if "start" not in event:
-            continue
-        event_start = parse_datetime(event["start"])
-        if event_start and week_start <= event_start <= week_end:
-            week_events.append(event)
-    
-    event_durations = {}
-    for event in week_events:
-        event_start = parse_datetime(event["start"])
-        event_end = parse_datetime(event["end"])
-        if event_start and event_end:
-            duration = (event_end - event_start).total_seconds() / 60
-            
-            title = event["title"]
-            if title in event_durations:
-                event_durations[title] += duration
-            else:
-                event_durations[title] = duration
+    """Get event statistics for the current week, an ISO week or a range of weeks.
+
+    ``week=2026-W42`` selects one week and ``range=2026-W40..2026-W42`` an
+    inclusive span of weeks; without either the current week is reported.
+    """
+    try:
+        if "range" in request.args:
+            first_week, last_week = request.args["range"].split("..")
+            week_start = parse_week(first_week)
+            last_week_start = parse_week(last_week)
+        elif "week" in request.args:
+            week_start = last_week_start = parse_week(request.args["week"])
+        else:
+            week_start = last_week_start = start_of_week(utc_now())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    sorted_events = sorted(
-        event_durations.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
+    if last_week_start < week_start:
+        return jsonify({"error": "Invalid week range"}), 400
+    if (last_week_start - week_start).days // 7 >= MAX_STATISTICS_WEEKS:
+        return jsonify({"error": f"At most {MAX_STATISTICS_WEEKS} weeks per range"}), 400
+    if datetime.max - last_week_start < timedelta(days=7):
+        return jsonify({"error": "Week out of range"}), 400
+    week_end = last_week_start + timedelta(days=7)
     
     return jsonify({
         "week_start": week_start.isoformat(),
         "week_end": week_end.isoformat(),
-        "event_durations": dict(sorted_events)
+        "event_durations": stats.durations(week_start, week_end)
     })
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Expose request latencies and hot-path counters in the Prometheus text format."""
+    if not REGISTRY.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/reschedule", methods=["POST"])
 def reschedule_events():
-    """Reschedule non-fixed events within a specified time frame."""
+    """Reschedule non-fixed events within a specified time frame.
+
+    ``mode`` picks the greedy pass (default), which re-places events one at a
+    time by priority, or ``solver``, which searches for a better packing for
+    up to ``time_budget_ms``. Both report the objective they reached: the
+    number of events and occurrences placed and their weighted priority.
+    Events that cannot be placed are listed in ``failed_events`` and kept,
+    at their old slot if it is still free and without a slot otherwise.
+
+    With ``async`` the reschedule runs in the background and a job is
+    returned at once (202); GET /jobs/<id> reports its progress and result.
+    """
     data = request.json
     start_date = parse_datetime(data.get("start_date"))
     end_date = parse_datetime(data.get("end_date"))
@@ -362,194 +888,589 @@ def reschedule_events():
     if not start_date or not end_date:
         return jsonify({"error": "Invalid date range"}), 400
     
+    mode = data.get("mode", "greedy")
+    if mode not in ("greedy", "solver"):
+        return jsonify({"error": "mode must be greedy or solver"}), 400
+    try:
+        budget = min(int(data.get("time_budget_ms", DEFAULT_SOLVER_BUDGET_MS)), MAX_SOLVER_BUDGET_MS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid time_budget_ms"}), 400
+    
+    if data.get("async"):
+        calendar = g.calendar
+        job = jobs.submit(
+            "reschedule",
+            calendar.id,
+            lambda job: run_reschedule_job(job, calendar, start_date, end_date, mode, budget)
+        )
+        return jsonify(job.to_dict()), 202, {"Location": f"/jobs/{job.id}"}
+    
+    with store.transaction():
+        window = release_window(start_date, end_date)
+        pending = []
+        result = plan_reschedule(window, mode, budget, pending.append)
+        apply_reschedule(window, pending, result)
+    return jsonify(result)
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Report a background job's status and progress, and its result once it has one."""
+    job = jobs.get(job_id)
+    if job is None or job.calendar_id != g.calendar.id:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+def release_window(start_date, end_date):
+    """Work out what rescheduling [start_date, end_date] moves, without writing.
+
+    Events to place again are copies, so planning never touches stored
+    objects; the window's series occurrences are marked displaced on their
+    parent's copy. Flexible events left without a slot by an earlier
+    reschedule are released too when their window meets the range. Callers
+    hold the store's lock.
+    """
     events_to_reschedule = []
-    fixed_events = []
+    removals = []
+    instances = {}
+    released = set()
     
     # First, group recurring instances by parent_id
     recurring_parents = {}
     
-    for event in events[:]:
-        if "start" not in event:
-            continue
-            
-        event_start = parse_datetime(event["start"])
-        if not event_start or not (start_date <= event_start <= end_date):
+    range_end = end_date + timedelta(seconds=1)
+    for event in chain(store.starting_in(start_date, range_end), store.unscheduled(start_date, range_end)):
+        if event.type == "fixed":
             continue
-            
-        if event["type"] == "fixed":
-            fixed_events.append(event)
-        elif event["type"] == "recurring_instance":
-            parent_id = event.get("parent_id")
+        if event.type == "recurring_instance":
+            parent_id = event.parent_id
             if parent_id:
                 if parent_id not in recurring_parents:
-                    # Find original recurring event properties
-                    for e in events:
-                        if e.get("id") == parent_id:
-                            recurring_parents[parent_id] = {
-                                "title": e["title"],
-                                "priority": e["priority"],
-                                "type": e["type"],
-                                "duration": e.get("duration", "60"),  # Default 60 minutes
-                                "frequency": e.get("frequency", "1"),  # Default daily
-                                "preferred_time": e.get("preferred_time"),
-                                "start_date": event_start.isoformat()
-                            }
-                            break
-                events.remove(event)
+                    # Find the series rule the instance belongs to
+                    parent = store.get(parent_id)
+                    if parent and parent.recurrence:
+                        recurring_parents[parent_id] = (copy.deepcopy(parent), [])
+                if parent_id in recurring_parents:
+                    recurring_parents[parent_id][1].append(event.occurrence)
+                    released.add(event.id)
+                    if event.id > 0:
+                        removals.append(event.id)
+                        instances[parent_id, event.occurrence, event.start, event.end] = event.id
         else:
-            events.remove(event)
+            event = copy.deepcopy(event)
+            released.add(event.id)
+            removals.append(event.id)
+            if event.flexibility is None and event.is_timed:
+                # Stored before flexible constraints were kept: it may move within the window
+                event.flexibility = Flexibility(
+                    earliest_start=start_date,
+                    deadline=end_date,
+                    duration=int((event.end - event.start).total_seconds() // 60)
+                )
             events_to_reschedule.append(event)
     
-    # Add recurring parent events to reschedule list
-    for parent_id, parent_data in recurring_parents.items():
-        events_to_reschedule.append({
-            "id": parent_id,
-            **parent_data
-        })
+    # Release the series occurrences in the window so their slots are free again
+    occurrences_to_reschedule = {}
+    for parent, indexes in recurring_parents.values():
+        parent.recurrence.displaced.update(indexes)
+        occurrences_to_reschedule[parent.id] = sorted(indexes)
+        events_to_reschedule.append(parent)
     
     # Sort by priority
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    events_to_reschedule.sort(key=lambda x: priority_order[x["priority"]])
+    events_to_reschedule.sort(key=lambda event: PRIORITY_ORDER.get(event.priority, len(PRIORITY_ORDER)))
     
-    rescheduled_events = []
-    failed_events = []
+    # Everything that stays is busy over the range the released events may move in
+    span_start, span_end = start_date, end_date + timedelta(seconds=1)
+    for event in events_to_reschedule:
+        if event.recurrence is not None:
+            rule, indexes = event.recurrence, occurrences_to_reschedule[event.id]
+            span_start = min(span_start, rule.day(indexes[0]).replace(hour=0, minute=0, second=0))
+            span_end = max(span_end, rule.day(indexes[-1]).replace(hour=23, minute=59, second=59))
+        elif event.flexibility is not None:
+            span_start = min(span_start, event.flexibility.earliest_start)
+            span_end = max(span_end, event.flexibility.deadline)
+    timeline = BusyTimeline(
+        (event.start, event.end)
+        for event in store.overlapping(span_start, span_end)
+        if event.id not in released
+    )
+    return ReleasedWindow(
+        events_to_reschedule, occurrences_to_reschedule, removals, instances, timeline, (span_start, span_end)
+    )
+
+def plan_reschedule(window, mode, budget, save):
+    """Place a released window's events on its timeline, handing every event to write to ``save``.
+
+    Returns the /reschedule response body.
+    """
+    events_to_reschedule = window.events
+    started = time.perf_counter()
+    if mode == "solver":
+        placed, solution = solve_reschedule(
+            events_to_reschedule, window.occurrences, window.timeline, budget / 1000, save
+        )
+        objective = solution.objective()
+        timed_out = solution.timed_out
+    else:
+        placed = {}
+        objective = {"placed": 0, "weighted_priority": 0}
+        for event in events_to_reschedule:
+            if event.recurrence is not None:
+                count = schedule_occurrences(event, window.occurrences[event.id], window.timeline, save)
+                save(event)
+            elif event.flexibility is not None:
+                count = int(handle_flexible_event(flexible_event_data(event), event, window.timeline, save))
+            else:
+                count = 0
+            placed[event.id] = count
+            objective["placed"] += count
+            objective["weighted_priority"] += count * PRIORITY_WEIGHTS.get(event.priority, 1)
+        timed_out = False
+    runtime_ms = (time.perf_counter() - started) * 1000
     
+    # Events that found no place are kept: at their old slot while it is
+    # still free, otherwise without a slot until a later reschedule places them
     for event in events_to_reschedule:
-        if event["type"].startswith("recurring"):
-            success = handle_recurring_event(event, event)
-        elif event["type"].startswith("flexible"):
-            success = handle_flexible_event(event, event)
-        else:
-            success = False
-            
-        if success:
-            rescheduled_events.append(event)
-        else:
-            failed_events.append(event)
+        if event.recurrence is None and not placed[event.id]:
+            if event.is_timed and window.timeline.is_free(event.start, event.end):
+                window.timeline.add(event.start, event.end)
+            else:
+                event.start = event.end = None
+            save(event)
     
-    return jsonify({
+    rescheduled_events = [event for event in events_to_reschedule if placed[event.id]]
+    failed_events = [event.to_dict() for event in events_to_reschedule if not placed[event.id]]
+    
+    return {
         "success": len(rescheduled_events),
         "failed": len(failed_events),
-        "failed_events": failed_events
+        "failed_events": failed_events,
+        "mode": mode,
+        "objective": objective,
+        "runtime_ms": round(runtime_ms, 3),
+        "timed_out": timed_out
+    }
+
+def apply_reschedule(window, pending, result):
+    """Write a planned reschedule: drop the released events, then store the placed ones.
+
+    A series instance placed back in the slot it was stored at is left as it
+    is, so it keeps its id and no change is reported for it.
+    """
+    unchanged = set()
+    for event in pending:
+        if event.type == "recurring_instance":
+            stored_id = window.instances.get((event.parent_id, event.occurrence, event.start, event.end))
+            if stored_id is not None:
+                unchanged.add(stored_id)
+                event.id = stored_id
+    for event_id in window.removals:
+        if event_id not in unchanged:
+            store.remove(event_id)
+    for event in pending:
+        if event.id not in unchanged:
+            store.add(event)
+    RESCHEDULED_EVENTS.inc(result["success"], (result["mode"], "rescheduled"))
+    RESCHEDULED_EVENTS.inc(result["failed"], (result["mode"], "failed"))
+
+def run_reschedule_job(job, calendar, start_date, end_date, mode, budget):
+    """Reschedule in the background: plan from a snapshot, then commit if it still holds.
+
+    The snapshot is taken under the read lock and the plan made with no lock
+    held, so other requests carry on meanwhile. A write since the snapshot
+    that touches the released events or the range they move in means the
+    plan may be stale: it is dropped and made again, up to
+    RESCHEDULE_JOB_ATTEMPTS times. Writes of other processes sharing the
+    store only show in its shared version, so any of them counts as a change.
+    """
+    with app.app_context():
+        g.calendar = calendar
+        for attempt in range(1, RESCHEDULE_JOB_ATTEMPTS + 1):
+            job.progress = {"stage": "snapshot", "attempt": attempt}
+            with store.reading():
+                version = changes.version, store.shared_version()
+                window = release_window(start_date, end_date)
+            job.progress = {"stage": "planning", "attempt": attempt, "events": len(window.events)}
+            pending = []
+            result = plan_reschedule(window, mode, budget, pending.append)
+            job.progress = {"stage": "committing", "attempt": attempt, "events": len(window.events)}
+            with store.transaction():
+                if not window_changed(window, version):
+                    apply_reschedule(window, pending, result)
+                    job.progress = {"stage": "done", "attempt": attempt, "events": len(window.events)}
+                    return result
+        raise JobConflict("The window kept changing while the reschedule was planned")
+
+def window_changed(window, version):
+    """Return True if a write after version could invalidate a plan for the released window.
+
+    ``version`` pairs the change log version with the store's shared version.
+    """
+    local_version, shared_version = version
+    if store.shared_version() != shared_version:
+        return True
+    entries = changes.entries_since(local_version)
+    if entries is None:
+        return True
+    touched = set(window.removals)
+    touched.update(event.id for event in window.events)
+    span_start, span_end = window.span
+    for _, event in entries:
+        if event.id in touched or event.parent_id in touched:
+            return True
+        if event.recurrence is not None:
+            start, end = event.recurrence.span()
+        else:
+            start, end = event.start, event.end
+        if start is not None and start < span_end and span_start < end:
+            return True
+    return False
+
+def flexible_event_data(event):
+    """The request fields handle_flexible_event needs to place a stored flexible event again."""
+    data = event.to_dict()
+    data.update(event.flexibility.to_dict())
+    return data
+
+def solve_reschedule(events, occurrences, timeline, budget, save):
+    """Place flexible events and series occurrences together with the reschedule solver.
+
+    Placed events, moved instances and the series parents go to ``save``.
+    Returns the number placed per event id and the solver's solution.
+    """
+    tasks = []
+    owners = []
+    for event in events:
+        weight = PRIORITY_WEIGHTS.get(event.priority, 1)
+        if event.recurrence is not None:
+            rule = event.recurrence
+            window = parse_preferred_time(rule.preferred_time)
+            for index in occurrences[event.id]:
+                day = rule.day(index)
+                day_start = day.replace(hour=0, minute=0, second=0)
+                day_end = day.replace(hour=23, minute=59, second=59)
+                # Keep occurrences on their nominal slot, then in their preferred window
+                preferred = [rule.nominal_slot(index)]
+                if window:
+                    preferred.extend(window.between(day_start, day_end))
+                tasks.append(Task(rule.length, day_start, day_end, weight, preferred))
+                owners.append((event, index))
+        elif event.flexibility is not None:
+            tasks.append(flexible_task(event))
+            owners.append((event, None))
+    
+    placed = {event.id: 0 for event in events}
+    if not tasks:
+        return placed, Solution(slots={}, placed=0, weighted=0, timed_out=False)
+    
+    solution = Solver(timeline, tasks, slot_step(15), budget).solve()
+    
+    for task_index, (event, index) in enumerate(owners):
+        slot = solution.slots.get(task_index)
+        if index is not None:
+            place_occurrence(event, index, slot, save)
+        elif slot:
+            event.start, event.end = slot
+            save(event)
+        if slot:
+            timeline.add(*slot)
+            placed[event.id] += 1
+    for event in events:
+        if event.recurrence is not None:
+            save(event)
+    return placed, solution
+
+def flexible_task(event):
+    """The solver task that places a flexible event inside its window."""
+    flexibility = event.flexibility
+    preferred = []
+    if event.type == "flexible_with_preferred_time" and flexibility.preferred_time:
+        preferred = list(preferred_windows(
+            flexibility.earliest_start, flexibility.deadline, flexibility.preferred_time
+        ))
+    return Task(
+        flexibility.length,
+        flexibility.earliest_start,
+        flexibility.deadline,
+        PRIORITY_WEIGHTS.get(event.priority, 1),
+        preferred
+    )
+
+def is_movable(event):
+    """Whether re-planning may move a stored event: timed flexible events only."""
+    return event.flexibility is not None and event.type.startswith("flexible") and event.is_timed
+
+def replan_neighborhood(events, extra_tasks=(), blocked=None):
+    """Build the solver for re-placing ``events`` (and ``extra_tasks``) around everything else.
+
+    The timeline holds the busy time of every other event over the tasks'
+    windows, plus the ``blocked`` interval if given.
+    """
+    tasks = [flexible_task(event) for event in events] + list(extra_tasks)
+    span_start = min(task.earliest for task in tasks)
+    span_end = max(task.deadline for task in tasks)
+    ids = {event.id for event in events}
+    timeline = BusyTimeline(
+        (event.start, event.end)
+        for event in store.overlapping(span_start, span_end)
+        if event.id not in ids
+    )
+    if blocked:
+        timeline.add(*blocked)
+    return Solver(timeline, tasks, slot_step(15), REPLAN_BUDGET_MS / 1000)
+
+def apply_moves(events, solution):
+    """Store the events whose slot the solution changed; return them."""
+    moved = []
+    for index, event in enumerate(events):
+        slot = solution.slots[index]
+        if slot != (event.start, event.end):
+            event = copy.copy(event)
+            event.start, event.end = slot
+            store.add(event)
+            moved.append(event)
+    return moved
+
+def make_room_for(new_event):
+    """Fit a new event in by moving flexible events out of its way.
+
+    A fixed event may take the slot of flexible events of no higher
+    priority; a flexible event that found no free slot is placed among the
+    flexible events around its window. Either way the events in the way are
+    moved by ejection chains within their own windows, and nothing changes
+    unless all of them still fit. Returns the moved events, already stored,
+    or None if there is no room.
+    """
+    if new_event.flexibility is None:
+        rank = PRIORITY_ORDER.get(new_event.priority, len(PRIORITY_ORDER))
+        blockers = store.overlapping(new_event.start, new_event.end)
+        if not all(
+            is_movable(event) and PRIORITY_ORDER.get(event.priority, len(PRIORITY_ORDER)) >= rank
+            for event in blockers
+        ):
+            return None
+        must_move = {event.id for event in blockers}
+        span_start = min([new_event.start] + [event.flexibility.earliest_start for event in blockers])
+        span_end = max([new_event.end] + [event.flexibility.deadline for event in blockers])
+        extra_tasks = []
+        blocked = (new_event.start, new_event.end)
+    else:
+        must_move = set()
+        span_start, span_end = new_event.flexibility.earliest_start, new_event.flexibility.deadline
+        try:
+            extra_tasks = [flexible_task(new_event)]
+        except ValueError:
+            return None
+        blocked = None
+    
+    neighbors = [event for event in store.overlapping(span_start, span_end) if is_movable(event)]
+    if len(neighbors) > MAX_REPLAN_EVENTS or not (neighbors or extra_tasks):
+        return None
+    solver = replan_neighborhood(neighbors, extra_tasks, blocked)
+    solution = solver.repair({
+        index: (event.start, event.end)
+        for index, event in enumerate(neighbors)
+        if event.id not in must_move
+    })
+    if solution.placed < len(solver.tasks):
+        return None
+    
+    if extra_tasks:
+        new_event.start, new_event.end = solution.slots[len(neighbors)]
+        store.add(new_event)
+    return apply_moves(neighbors, solution)
+
+def fill_gap(start, end):
+    """Pull flexible events into time freed in [start, end); return the moved events.
+
+    Candidates start in the gap or up to REPLAN_HORIZON after it and may be
+    placed in it. Highest priority first, each moves to its first free slot
+    if that is earlier or in an earlier preferred window than where it is.
+    """
+    candidates = [
+        event for event in store.starting_in(start, end + REPLAN_HORIZON)
+        if is_movable(event) and event.flexibility.earliest_start < end and event.flexibility.deadline > start
+    ][:MAX_REPLAN_EVENTS]
+    if not candidates:
+        return []
+    solution = replan_neighborhood(candidates).compact({
+        index: (event.start, event.end) for index, event in enumerate(candidates)
     })
+    return apply_moves(candidates, solution)
 
 def handle_recurring_event(data, new_event):
-    """Handle recurring event scheduling."""
-    duration = timedelta(minutes=int(data["duration"]))
+    """Handle recurring event scheduling.
+
+    The parent is stored with its recurrence rule. Occurrences that fit their
+    nominal slot stay virtual; only the ones moved by conflicts are stored.
+    """
+    try:
+        new_event.recurrence = parse_recurrence(data)
+    except ValueError as e:
+        app.logger.warning("Error parsing recurring event: %s", e)
+        return False
+    
+    if not schedule_occurrences(new_event, list(range(new_event.recurrence.count))):
+        return False
+    store.add(new_event)
+    return True
+
+def parse_recurrence(data):
+    """Build the recurrence rule described by a recurring event's fields.
+
+    Raises ValueError if they do not describe a valid series.
+    """
+    duration = int(data["duration"])
     frequency = int(data["frequency"])
     start_date = parse_datetime(data.get("start_date"))
+    end_date = parse_datetime(data.get("end_date"))
     
-    if not start_date:
-        return False
+    if not start_date or frequency < 1 or duration < 1:
+        raise ValueError("Invalid recurrence")
+    
+    # Series run for 30 days unless an end_date is given
+    end_date = end_date or start_date + timedelta(days=30)
+    if end_date < start_date:
+        raise ValueError("end_date is before start_date")
+    count = (end_date - start_date) // timedelta(days=frequency) + 1
+    if count > MAX_OCCURRENCES:
+        raise ValueError(f"A series has at most {MAX_OCCURRENCES} occurrences")
+    
+    preferred_time = None
+    if data.get("type") == "recurring_with_preferred_time" and data.get("preferred_time"):
+        preferred_time = data["preferred_time"]
+    return Recurrence(
+        anchor=start_date,
+        frequency=frequency,
+        duration=duration,
+        count=count,
+        preferred_time=preferred_time
+    )
+
+def schedule_occurrences(parent, indexes, timeline=None, save=None):
+    """Place the given occurrences of a series against the busy time of their days."""
+    if timeline is None:
+        rule = parent.recurrence
+        timeline = build_timeline(
+            rule.day(indexes[0]).replace(hour=0, minute=0, second=0),
+            rule.day(indexes[-1]).replace(hour=23, minute=59, second=59)
+        )
+    return place_occurrences(parent, indexes, timeline, save)
+
+def place_occurrences(parent, indexes, timeline, save=None):
+    """Place series occurrences, storing an instance only for those that had to move.
+
+    Moved instances go to ``save`` (default ``store.add``). Returns the number
+    of occurrences that found a slot.
+    """
+    rule = parent.recurrence
+    duration = rule.length
+    window = parse_preferred_time(rule.preferred_time)
+    placed = 0
     
-    end_date = start_date + timedelta(days=30)
-    scheduled_instances = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        if data.get("type") == "recurring_with_preferred_time" and data.get("preferred_time"):
-            try:
-                pref_start, pref_end = parse_preferred_time(data["preferred_time"])
-                
-                # First try preferred time window
-                day_start = datetime.combine(current_date.date(), pref_start)
-                day_end = datetime.combine(current_date.date(), pref_end)
-                
-                slot = find_available_slot(day_start, day_end, duration)
-                
-                # If no slot in preferred time, try whole day
-                if not slot:
-                    day_start = current_date.replace(hour=0, minute=0, second=0)
-                    day_end = current_date.replace(hour=23, minute=59, second=59)
-                    slot = find_available_slot(day_start, day_end, duration)
-                    
-            except ValueError as e:
-                print(f"Error parsing preferred time: {e}")
-                return False
+    for index in indexes:
+        day = rule.day(index)
+        day_start = day.replace(hour=0, minute=0, second=0)
+        day_end = day.replace(hour=23, minute=59, second=59)
+        # An overnight window gives the day its early hours and its late ones
+        windows = list(window.between(day_start, day_end)) if window else [(day_start, day_end)]
+        
+        nominal_start, nominal_end = rule.nominal_slot(index)
+        if (any(start <= nominal_start and nominal_end <= end for start, end in windows)
+                and timeline.is_free(nominal_start, nominal_end)):
+            slot = nominal_start, nominal_end
         else:
-            day_start = current_date.replace(hour=0, minute=0, second=0)
-            day_end = current_date.replace(hour=23, minute=59, second=59)
-            slot = find_available_slot(day_start, day_end, duration)
+            # If no slot in preferred time, try whole day
+            slot = find_preferred_slot(timeline, day_start, day_end, duration, rule.preferred_time)
         
+        place_occurrence(parent, index, slot, save)
         if slot:
-            instance = {
-                "id": len(events) + len(scheduled_instances) + 1,
-                "title": data["title"],
-                "priority": data["priority"],
-                "type": "recurring_instance",
-                "start": slot[0].isoformat(),
-                "end": slot[1].isoformat(),
-                "parent_id": new_event["id"]
-            }
-            scheduled_instances.append(instance)
-        
-        current_date += timedelta(days=frequency)
+            timeline.add(*slot)
+            placed += 1
     
-    if scheduled_instances:
-        events.extend(scheduled_instances)
-        return True
-    return False
+    return placed
+
+def place_occurrence(parent, index, slot, save=None):
+    """Record where an occurrence went, storing an instance if it left its nominal slot.
+
+    A slot of None leaves the occurrence displaced with no instance.
+    """
+    rule = parent.recurrence
+    if slot == rule.nominal_slot(index):
+        rule.displaced.discard(index)
+        return
+    rule.displaced.add(index)
+    if slot:
+        instance = parent.instance(index, *slot)
+        instance.id = store.next_id()
+        (save or store.add)(instance)
+
+def find_preferred_slot(timeline, earliest_start, deadline, duration, preferred_time=None):
+    """Return the earliest free slot in the daily preferred window, else in the whole range.
+
+    Raises ValueError if preferred_time is not a valid HH:MM-HH:MM range.
+    """
+    step = slot_step(15)
+    if preferred_time:
+        # Try within preferred time windows first
+        for day_start, day_end in preferred_windows(earliest_start, deadline, preferred_time):
+            slot = timeline.first_slot(day_start, day_end, duration, step)
+            if slot:
+                return slot
+    
+    # If no slot found in preferred times, try the whole time range
+    return timeline.first_slot(earliest_start, deadline, duration, step)
+
+def kept_slot(start, earliest_start, deadline, duration, timeline):
+    """The slot at start, if a valid one is given and it is free within the window."""
+    try:
+        start = parse_datetime(start)
+    except ValueError:
+        return None
+    if start is None or start < earliest_start or start + duration > deadline:
+        return None
+    if not timeline.is_free(start, start + duration):
+        return None
+    return start, start + duration
 
-def handle_flexible_event(data, new_event):
-    """Handle flexible event scheduling."""
+def handle_flexible_event(data, new_event, timeline=None, save=None):
+    """Handle flexible event scheduling.
+
+    A caller placing several events can share one ``timeline`` between them
+    and collect the placed events through ``save`` instead of storing them.
+    A ``start`` in the data, like an imported event's current slot, is kept
+    when the event fits there within its window and the slot is free.
+    """
     duration = timedelta(minutes=int(data["duration"]))
     earliest_start = parse_datetime(data["earliest_start"])
     deadline = parse_datetime(data["deadline"])
     
     if not earliest_start or not deadline:
         return False
+    new_event.flexibility = Flexibility(
+        earliest_start=earliest_start,
+        deadline=deadline,
+        duration=int(data["duration"]),
+        preferred_time=data.get("preferred_time") or None
+    )
+    
+    if timeline is None:
+        timeline = build_timeline(earliest_start, deadline)
+    preferred_time = None
+    if data.get("type") == "flexible_with_preferred_time":
+        preferred_time = data.get("preferred_time")
+    slot = kept_slot(data.get("start"), earliest_start, deadline, duration, timeline)
+    try:
+        slot = slot or find_preferred_slot(timeline, earliest_start, deadline, duration, preferred_time)
+    except ValueError as e:
+        app.logger.warning("Error parsing preferred time: %s", e)
+        return False
+    if not slot:
+        return False
         
-    if data.get("type") == "flexible_with_preferred_time" and data.get("preferred_time"):
-        try:
-            pref_start, pref_end = parse_preferred_time(data["preferred_time"])
-            
-            # Try within preferred time windows first
-            current_date = earliest_start.date()
-            while current_date <= deadline.date():
-                day_start = max(
-                    datetime.combine(current_date, pref_start),
-                    earliest_start if current_date == earliest_start.date() else datetime.min
-                )
-                day_end = min(
-                    datetime.combine(current_date, pref_end),
-                    deadline if current_date == deadline.date() else datetime.max
-                )
-                
-                slot = find_available_slot(day_start, day_end, duration)
-                if slot:
-                    new_event.update({
-                        "start": slot[0].isoformat(),
-                        "end": slot[1].isoformat()
-                    })
-                    events.append(new_event)
-                    return True
-                    
-                current_date += timedelta(days=1)
-                
-            # If no slot found in preferred times, try the whole time range
-            slot = find_available_slot(earliest_start, deadline, duration)
-            if slot:
-                new_event.update({
-                    "start": slot[0].isoformat(),
-                    "end": slot[1].isoformat()
-                })
-                events.append(new_event)
-                return True
-                
-        except ValueError as e:
-            print(f"Error parsing preferred time: {e}")
-            return False
-    else:
-        # Try to find any available slot in the whole range
-        slot = find_available_slot(earliest_start, deadline, duration)
-        if slot:
-            new_event.update({
-                "start": slot[0].isoformat(),
-                "end": slot[1].isoformat()
-            })
-            events.append(new_event)
-            return True
-            
-    return False
+    new_event.start, new_event.end = slot
+    timeline.add(*slot)
+    (save or store.add)(new_event)
+    return True
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the bitmap backend needs it
+    np = None
+
+from metrics import SLOT_SEARCHES
+from timeutils import parse_preferred_time
+
+EPOCH = datetime(1970, 1, 1)
+DAY = timedelta(days=1)
+
+
+class AvailabilityBitmap:
+    """Occupancy counts of one calendar per cell of ``resolution``, a day per array.
+
+    Days are built from the store on first use and kept current from its
+    writes: a timed event adds or removes one over the cells it touches, and
+    a change to a recurring parent drops the cached days of its series so
+    they are rebuilt with the new occurrences. A start is feasible when the
+    sliding sum of busy cells over the duration is zero, which one cumulative
+    sum answers for a whole range. Cells partly covered by an event count as
+    busy, so conflicts are exact for times on the resolution grid.
+    """
+
+    def __init__(self, store, resolution=timedelta(minutes=1), max_days=731):
+        if np is None:
+            raise RuntimeError("The bitmap availability backend needs NumPy")
+        if DAY % resolution:
+            raise ValueError("resolution must divide a day")
+        self.store = store
+        self.resolution = resolution
+        self.max_days = max_days
+        self.cells_per_day = DAY // resolution
+        self._days = {}
+        self._spans = {}
+        store.subscribe(self.record, immediate=True)
+
+    def _cell(self, moment, up=False):
+        """Index of the grid cell starting at or before moment (at or after it if up)."""
+        cell, rest = divmod(moment - EPOCH, self.resolution)
+        return cell + 1 if up and rest else cell
+
+    def _day(self, day):
+        counts = self._days.get(day)
+        if counts is not None:
+            return counts
+        counts = np.zeros(self.cells_per_day, dtype=np.int32)
+        day_start = EPOCH + day * DAY
+        base = day * self.cells_per_day
+        for event in self.store.overlapping(day_start, day_start + DAY):
+            self._spans[event.id] = event.start, event.end
+            first = max(self._cell(event.start) - base, 0)
+            counts[first:self._cell(event.end, up=True) - base] += 1
+        while len(self._days) >= self.max_days:
+            self._days.pop(next(iter(self._days)), None)
+        self._days[day] = counts
+        return counts
+
+    def _apply(self, start, end, delta):
+        first, last = self._cell(start), self._cell(end, up=True)
+        for day in range(first // self.cells_per_day, (last - 1) // self.cells_per_day + 1):
+            counts = self._days.get(day)
+            if counts is not None:
+                base = day * self.cells_per_day
+                counts[max(first - base, 0):last - base] += delta
+
+    def record(self, op, event):
+        """Store listener: apply one write to the cached days."""
+        if op == "rollback":
+            self.clear()
+            return
+        if event.recurrence is not None:
+            series_start, series_end = event.recurrence.span()
+            first = self._cell(series_start) // self.cells_per_day
+            last = self._cell(series_end, up=True) // self.cells_per_day
+            for day in [day for day in self._days if first <= day <= last]:
+                del self._days[day]
+        old = self._spans.pop(event.id, None)
+        if old is not None:
+            self._apply(*old, -1)
+        if op != "deleted" and event.is_timed and event.end > event.start:
+            self._spans[event.id] = event.start, event.end
+            self._apply(event.start, event.end, 1)
+
+    def clear(self):
+        self._days.clear()
+        self._spans.clear()
+
+    def _counts(self, first, last):
+        """Occupancy counts of cells [first, last) as one array."""
+        first_day, last_day = first // self.cells_per_day, (last - 1) // self.cells_per_day
+        days = [self._day(day) for day in range(first_day, last_day + 1)]
+        counts = days[0] if len(days) == 1 else np.concatenate(days)
+        offset = first_day * self.cells_per_day
+        return counts[first - offset:last - offset]
+
+    def occupied(self, start, end):
+        """Return True if anything is booked in [start, end)."""
+        first, last = self._cell(start), self._cell(end, up=True)
+        return last > first and bool(self._counts(first, last).any())
+
+    def busy(self, start, end):
+        """Return the runs of booked cells overlapping [start, end) as (start, end) pairs.
+
+        Runs are disjoint and sorted, so they can seed a BusyTimeline for
+        placement that has to track its own bookings as it goes.
+        """
+        first, last = self._cell(start), self._cell(end, up=True)
+        if last <= first:
+            return []
+        busy = np.concatenate(([0], self._counts(first, last) > 0, [0])).astype(np.int8)
+        edges = first + np.flatnonzero(np.diff(busy))
+        return [
+            (EPOCH + int(run_start) * self.resolution, EPOCH + int(run_end) * self.resolution)
+            for run_start, run_end in zip(edges[::2], edges[1::2])
+        ]
+
+    def feasible_starts(self, start, end, duration, step=None, preferred_time=None, limit=None):
+        """Return every free start for duration inside [start, end), earliest first.
+
+        Starts lie on the ``step`` grid counted from ``start`` (rounded up to
+        the resolution); with ``preferred_time`` only slots inside the daily
+        preferred window are returned.
+        """
+        SLOT_SEARCHES.inc(labels=("bitmap",))
+        first, last = self._cell(start, up=True), self._cell(end)
+        width = max(1, -(-duration // self.resolution))
+        if last - first < width:
+            return []
+
+        busy = self._counts(first, last) > 0
+        sums = np.concatenate(([0], np.cumsum(busy, dtype=np.int64)))
+        feasible = sums[width:] == sums[:-width]
+        offsets = np.arange(len(feasible))
+        if step:
+            feasible &= offsets % max(1, step // self.resolution) == 0
+        if preferred_time:
+            window_start, window_end = parse_preferred_time(preferred_time).on(EPOCH.date())
+            window_start, window_end = self._cell(window_start, up=True), self._cell(window_end)
+            time_of_day = (first + offsets) % self.cells_per_day
+            in_window = (time_of_day >= window_start) & (time_of_day + width <= window_end)
+            if window_end > self.cells_per_day:
+                # Overnight: the hours after midnight belong to the window of the day before
+                in_window |= time_of_day + width <= window_end - self.cells_per_day
+            feasible &= in_window
+
+        cells = first + np.flatnonzero(feasible)[:limit]
+        resolution_us = self.resolution // timedelta(microseconds=1)
+        return (np.datetime64(EPOCH, "us") + cells * np.timedelta64(resolution_us, "us")).tolist()
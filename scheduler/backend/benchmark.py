@@ -0,0 +1,251 @@
+"""Benchmark the scheduler API on synthetic calendars.
+
+Run from scheduler/backend:
+
+    python benchmark.py --sizes 1000 10000 100000 --output results.json
+    python benchmark.py --compare baseline.json results.json
+
+Each size gets its own calendar, loaded through POST /events/batch, and every
+operation is timed through the Flask test client. Results hold latency
+percentiles in milliseconds and the memory allocated per request (traced
+separately, on a smaller sample, so tracing does not skew the timings).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from timeutils import format_datetime
+from workload import DEFAULT_MIX, WorkloadGenerator, parse_mix
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+LOAD_BATCH_SIZE = 5000
+
+
+def summarize(samples_ns):
+    samples = sorted(ns / 1e6 for ns in samples_ns)
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p90, p99 = cuts[49], cuts[89], cuts[98]
+    else:
+        p50 = p90 = p99 = samples[0]
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(p50, 4),
+        "p90_ms": round(p90, 4),
+        "p99_ms": round(p99, 4),
+        "max_ms": round(samples[-1], 4)
+    }
+
+
+def measure(call, requests, alloc_samples):
+    """Time ``requests`` calls, then trace allocations over ``alloc_samples`` more."""
+    timings = []
+    statuses = {}
+    for _ in range(requests):
+        started = time.perf_counter_ns()
+        response = call()
+        timings.append(time.perf_counter_ns() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    peaks = []
+    allocated = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            allocated.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    result = summarize(timings)
+    result["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    if peaks:
+        result["alloc_peak_kib"] = round(statistics.fmean(peaks) / 1024, 2)
+        result["alloc_retained_kib"] = round(statistics.fmean(allocated) / 1024, 2)
+    return result
+
+
+def load_calendar(client, headers, payloads):
+    started = time.perf_counter()
+    created = 0
+    for offset in range(0, len(payloads), LOAD_BATCH_SIZE):
+        response = client.post(
+            "/events/batch", json={"events": payloads[offset:offset + LOAD_BATCH_SIZE]}, headers=headers
+        )
+        created += response.get_json()["created"]
+    return {"requested": len(payloads), "created": created, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def bench_size(app, size, args):
+    generator = WorkloadGenerator(mix=args.mix, preferred_share=args.preferred_share, seed=args.seed + size)
+    days = generator.days_for(size)
+    headers = {"X-Calendar-Id": f"bench-{size}-{args.seed}"}
+    client = app.test_client()
+    result = {"days": days, "load": load_calendar(client, headers, generator.events(size, days))}
+
+    def create_event():
+        return client.post("/events", json=generator.event(days), headers=headers)
+
+    def find_available_slot():
+        start, end = generator.window(days, timedelta(days=7))
+        duration = generator.random.choice((30, 60, 120))
+        return client.get(
+            f"/slots?start={format_datetime(start)}&end={format_datetime(end)}&duration={duration}&limit=1",
+            headers=headers
+        )
+
+    def get_statistics():
+        start, _ = generator.window(days, timedelta(days=7))
+        week = start.isocalendar()
+        return client.get(f"/statistics?week={week[0]}-W{week[1]:02d}", headers=headers)
+
+    def get_events_range():
+        start, end = generator.window(days, timedelta(days=1))
+        return client.get(f"/events?start={format_datetime(start)}&end={format_datetime(end)}", headers=headers)
+
+    def get_events_page():
+        start, end = generator.window(days, timedelta(days=30))
+        return client.get(
+            f"/events?start={format_datetime(start)}&end={format_datetime(end)}&limit=100",
+            headers=headers
+        )
+
+    def reschedule(mode):
+        def call():
+            start, end = generator.window(days, timedelta(days=1))
+            return client.post(
+                "/reschedule",
+                json={"start_date": format_datetime(start), "end_date": format_datetime(end), "mode": mode},
+                headers=headers
+            )
+        return call
+
+    operations = {
+        "create_event": create_event,
+        "find_available_slot": find_available_slot,
+        "get_statistics": get_statistics,
+        "get_events_range": get_events_range,
+        "get_events_page": get_events_page,
+        "reschedule_greedy": reschedule("greedy"),
+        "reschedule_solver": reschedule("solver")
+    }
+    result["operations"] = {}
+    for name, call in operations.items():
+        requests = args.requests
+        if name.startswith("reschedule"):
+            requests = max(1, requests // 10)
+        result["operations"][name] = measure(call, requests, args.alloc_samples)
+        print(f"  {name}: p50 {result['operations'][name]['p50_ms']} ms", file=sys.stderr)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    if args.database:
+        os.environ["SCHEDULER_DB"] = args.database
+    if args.data_dir:
+        os.environ["SCHEDULER_DATA_DIR"] = args.data_dir
+    if args.availability:
+        os.environ["SCHEDULER_AVAILABILITY"] = args.availability
+    from app import app
+
+    report = {
+        "meta": {
+            "created": format_datetime(datetime.now()),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database,
+            "data_dir": args.data_dir,
+            "availability": args.availability or "index",
+            "seed": args.seed,
+            "requests": args.requests,
+            "mix": args.mix,
+            "preferred_share": args.preferred_share
+        },
+        "results": {}
+    }
+    for size in args.sizes:
+        print(f"{size} events", file=sys.stderr)
+        report["results"][str(size)] = bench_size(app, size, args)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print p50/p99 ratios of two result files; return True if anything regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    with open(current_path) as f:
+        current = json.load(f)["results"]
+
+    regressed = False
+    for size, result in current.items():
+        if size not in baseline:
+            continue
+        for name, stats in result["operations"].items():
+            before = baseline[size]["operations"].get(name)
+            if before is None:
+                continue
+            ratios = {
+                key: stats[key] / before[key] if before[key] else float("inf")
+                for key in ("p50_ms", "p99_ms")
+            }
+            flag = "REGRESSED" if ratios["p50_ms"] > threshold else ""
+            regressed = regressed or bool(flag)
+            print(
+                f"{size:>7} {name:<20} p50 {before['p50_ms']:>9.3f} -> {stats['p50_ms']:>9.3f} "
+                f"({ratios['p50_ms']:.2f}x)  p99 {before['p99_ms']:>9.3f} -> {stats['p99_ms']:>9.3f} "
+                f"({ratios['p99_ms']:.2f}x) {flag}"
+            )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per operation")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="requests traced for allocations")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="event mix, e.g. fixed=0.6,recurring=0.02,flexible=0.38")
+    parser.add_argument("--preferred-share", type=float, default=0.5,
+                        help="share of recurring and flexible events with a preferred time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database", help="benchmark the SQLite store in this file")
+    parser.add_argument("--data-dir", help="benchmark durable memory stores kept in this directory")
+    parser.add_argument("--availability", choices=("index", "bitmap"))
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p50 slowdown ratio reported as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import re
+import threading
+from contextlib import ExitStack, contextmanager
+
+from availability import AvailabilityBitmap
+from changes import ChangeLog
+from response_cache import ResponseCache
+from storage import MemoryStore, create_store, store_exists
+from weekly_stats import WeeklyStats
+
+CALENDAR_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+AVAILABILITY_BACKENDS = ("index", "bitmap")
+# Calendars one process keeps open; each holds a store, aggregates and, when durable, a lock file
+MAX_CALENDARS = 10000
+
+
+class Calendar:
+    """One tenant's partition: its event store and the aggregates fed by it.
+
+    Each calendar owns its interval indexes, lock, change log and weekly
+    statistics, so requests for one calendar never touch another's data.
+    With the "bitmap" availability backend it also keeps an occupancy bitmap
+    for conflict checks and slot search; otherwise ``availability`` is None
+    and those go through the store's interval index.
+    """
+
+    def __init__(self, calendar_id, store, availability="index"):
+        self.id = calendar_id
+        self.store = store
+        self.availability = AvailabilityBitmap(store) if availability == "bitmap" else None
+        # Recent mutations, served to clients as deltas by GET /events/changes
+        self.changes = ChangeLog()
+        store.subscribe(self.changes.record)
+        # Per-week duration totals behind /statistics, updated on every mutation
+        self.stats = WeeklyStats()
+        self.stats.load(store.all())
+        store.subscribe(self.stats.record)
+        # Serialized GET responses, emptied by every mutation
+        self.responses = ResponseCache()
+        store.subscribe(self.responses.record)
+
+    def version(self):
+        """Token that changes whenever this calendar's events change, whichever process writes them."""
+        token = f"{self.changes.log_id}-{self.changes.version}"
+        shared = self.store.shared_version()
+        return token if shared is None else f"{token}-{shared}"
+
+
+@contextmanager
+def hold(calendars, write=False):
+    """Hold several calendars' locks at once, reading or in one transaction each.
+
+    Locks are taken in calendar id order, so concurrent holders cannot deadlock.
+    """
+    with ExitStack() as stack:
+        for calendar in sorted(calendars, key=lambda calendar: calendar.id):
+            stack.enter_context(calendar.store.transaction() if write else calendar.store.reading())
+        yield
+
+
+class CalendarRegistry:
+    """Calendars by id, opened on first use.
+
+    Only writes create a calendar. A read of an id with nothing stored gets an
+    empty calendar that is not kept, so reads cannot fill memory, file
+    descriptors or the disk. At most ``max_calendars`` stay open at once.
+    """
+
+    def __init__(self, database=None, availability=None, data_dir=None, max_calendars=MAX_CALENDARS):
+        availability = availability or "index"
+        if availability not in AVAILABILITY_BACKENDS:
+            raise ValueError(f"Unknown availability backend: {availability}")
+        if database and data_dir:
+            raise ValueError("Use either a database or a data directory")
+        self.database = database
+        self.data_dir = data_dir
+        self.availability = availability
+        self.max_calendars = max_calendars
+        self._calendars = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calendars)
+
+    def get(self, calendar_id, create=True):
+        """Return the calendar with this id, creating it if needed.
+
+        With ``create`` false, an id with nothing stored yet gets an empty
+        calendar that is not kept. Raises ValueError for ids that are not 1-64
+        letters, digits, '_', '.' or '-', and RuntimeError when opening one
+        more calendar would exceed ``max_calendars``.
+        """
+        calendar = self._calendars.get(calendar_id)
+        if calendar is not None:
+            return calendar
+        if not CALENDAR_ID.fullmatch(calendar_id):
+            raise ValueError("Invalid calendar id")
+        if not create and not store_exists(self.database, calendar_id, self.data_dir):
+            return Calendar(calendar_id, MemoryStore(), self.availability)
+        with self._lock:
+            calendar = self._calendars.get(calendar_id)
+            if calendar is None:
+                if len(self._calendars) >= self.max_calendars:
+                    raise RuntimeError("Too many open calendars")
+                calendar = Calendar(
+                    calendar_id, create_store(self.database, calendar_id, self.data_dir), self.availability
+                )
+                self._calendars[calendar_id] = calendar
+        return calendar
@@ -0,0 +1,63 @@
+import uuid
+from collections import deque
+from itertools import islice
+
+
+class ChangeLog:
+    """Bounded log of store mutations, numbered by a monotonically increasing version.
+
+    Clients remember the version of their last sync and ask for everything
+    after it. Once the requested version has been evicted from the log, or
+    the log belongs to an earlier process (``log_id`` changes on restart),
+    the client has to resync from a full listing. Occurrences of recurring
+    series are generated per query, so a change to a recurring parent tells
+    the client to re-query the range it shows.
+    """
+
+    def __init__(self, capacity=10000):
+        self.log_id = uuid.uuid4().hex
+        self.version = 0
+        self._entries = deque(maxlen=capacity)
+
+    def record(self, op, event):
+        """Append a "created", "updated" or "deleted" change for an event."""
+        self.version += 1
+        self._entries.append((self.version, op, event.id, event))
+
+    def entries_since(self, version):
+        """Return the (op, event) writes after version in order, or None if evicted."""
+        if version > self.version:
+            return None
+        oldest = self._entries[0][0] if self._entries else self.version + 1
+        if version < oldest - 1:
+            return None
+        return [(op, event) for _, op, _, event in islice(self._entries, version - oldest + 1, None)]
+
+    def since(self, version):
+        """Return the compacted changes after version, or None if a resync is needed."""
+        entries = self.entries_since(version)
+        if entries is None:
+            return None
+
+        latest = {}
+        for op, event in entries:
+            event_id = event.id
+            if event_id in latest:
+                first_op = latest.pop(event_id)[0]
+            else:
+                first_op = op
+            latest[event_id] = (first_op, op, event)
+
+        changes = []
+        for event_id, (first_op, op, event) in latest.items():
+            if op == "deleted":
+                changes.append({"op": "deleted", "id": event_id, "type": event.type})
+            else:
+                # A delete followed by a re-add is an update from the client's view
+                changes.append({
+                    "op": "created" if first_op == "created" else "updated",
+                    "id": event_id,
+                    "type": event.type,
+                    "event": event.to_dict()
+                })
+        return changes
@@ -0,0 +1,336 @@
+import codecs
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+PRODID = "-//Smart Scheduler//Smart Scheduler//EN"
+# RFC 5545 lines are at most 75 octets, longer ones are folded
+LINE_LIMIT = 75
+READ_SIZE = 1 << 16
+DURATION = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+RRULE_DAYS = {"DAILY": 1, "WEEKLY": 7}
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# How an imported VEVENT relates to others: the UID it shares with its series,
+# the nominal start it overrides (RECURRENCE-ID) and the starts its rule excludes
+VEventInfo = namedtuple("VEventInfo", "uid recurrence_id exdates")
+
+
+def escape_text(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def unescape_text(value):
+    if "\\" not in value:
+        return value
+    return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def fold(line):
+    """Split a content line into 75 octet pieces joined by CRLF and a space."""
+    if len(line) <= LINE_LIMIT and line.isascii():
+        return line
+    pieces = []
+    current = []
+    size = 0
+    for char in line:
+        octets = len(char.encode())
+        if size + octets > LINE_LIMIT:
+            pieces.append("".join(current))
+            current = []
+            # Continuation lines start with a space
+            size = 1
+        current.append(char)
+        size += octets
+    pieces.append("".join(current))
+    return "\r\n ".join(pieces)
+
+
+def format_utc(moment):
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def ics_priority(priority):
+    return {"high": 1, "medium": 5, "low": 9}.get(priority, 0)
+
+
+def scheduler_priority(value):
+    """Map an RFC 5545 PRIORITY (1 highest, 9 lowest, 0 undefined) to ours."""
+    try:
+        level = int(value)
+    except (TypeError, ValueError):
+        return "medium"
+    if 1 <= level <= 4:
+        return "high"
+    return "low" if level >= 6 else "medium"
+
+
+@lru_cache(maxsize=64)
+def _zone(tzid):
+    try:
+        return ZoneInfo(tzid.strip('"'))
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {tzid}") from None
+
+
+def parse_ics_datetime(value, params=None):
+    """Parse a DATE-TIME value into a naive UTC datetime.
+
+    Times in UTC ('Z') are kept, times with a TZID are converted from that
+    zone and floating times are taken as UTC. All-day DATE values are not
+    supported, since every event here has a time slot.
+    """
+    params = params or {}
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        raise ValueError("All-day events are not supported")
+    if len(value) not in (15, 16) or value[8] != "T":
+        raise ValueError(f"Invalid date-time: {value}")
+    moment = datetime(
+        int(value[0:4]), int(value[4:6]), int(value[6:8]),
+        int(value[9:11]), int(value[11:13]), int(value[13:15])
+    )
+    if value.endswith("Z"):
+        return moment
+    tzid = params.get("TZID")
+    if tzid:
+        return moment.replace(tzinfo=_zone(tzid)).astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_ics_duration(value):
+    match = DURATION.fullmatch(value)
+    if not match or value.endswith(("P", "T")):
+        raise ValueError(f"Invalid duration: {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0)
+    )
+    return -duration if sign == "-" else duration
+
+
+def parse_rrule(value, start):
+    """Return (frequency in days, count, until) of a daily or weekly RRULE.
+
+    Raises ValueError for rules a fixed day interval cannot express.
+    """
+    parts = dict(part.split("=", 1) for part in value.upper().split(";") if "=" in part)
+    days = RRULE_DAYS.get(parts.pop("FREQ", None))
+    by_day = parts.pop("BYDAY", None)
+    if days == 7 and by_day == WEEKDAYS[start.weekday()]:
+        by_day = None
+    parts.pop("WKST", None)
+    interval = int(parts.pop("INTERVAL", 1))
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    until = parts.pop("UNTIL", None)
+    if days is None or by_day or parts or interval < 1:
+        raise ValueError(f"Unsupported RRULE: {value}")
+    if until is not None:
+        until = parse_ics_datetime(until) if len(until) > 8 else datetime.strptime(until, "%Y%m%d")
+    return days * interval, count, until
+
+
+def calendar_header(name=None):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{escape_text(name)}")
+    return "".join(fold(line) + "\r\n" for line in lines)
+
+
+def calendar_footer():
+    return "END:VCALENDAR\r\n"
+
+
+def vevent(event, uid, stamp, recurrence_id=None, excluded=()):
+    """Serialize a stored event as a VEVENT.
+
+    A recurring parent carries its rule as an RRULE, with the nominal starts
+    in ``excluded`` as EXDATE; a moved occurrence gets the ``recurrence_id``
+    of the nominal start it replaces. X-SCHEDULER properties keep what
+    iCalendar has no field for, so an import can restore the event.
+    """
+    lines = ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{stamp}"]
+    rule = event.recurrence
+    if rule is not None:
+        start, end = rule.nominal_slot(0)
+        lines += [
+            f"DTSTART:{format_utc(start)}",
+            f"DTEND:{format_utc(end)}",
+            f"RRULE:FREQ=DAILY;INTERVAL={rule.frequency};COUNT={rule.count}"
+        ]
+        if excluded:
+            lines.append("EXDATE:" + ",".join(format_utc(moment) for moment in excluded))
+    else:
+        lines += [f"DTSTART:{format_utc(event.start)}", f"DTEND:{format_utc(event.end)}"]
+    if recurrence_id is not None:
+        lines.append(f"RECURRENCE-ID:{format_utc(recurrence_id)}")
+    lines += [
+        f"SUMMARY:{escape_text(event.title)}",
+        f"PRIORITY:{ics_priority(event.priority)}",
+        f"X-SCHEDULER-TYPE:{event.type}"
+    ]
+    flexibility = event.flexibility
+    if flexibility is not None:
+        lines += [
+            f"X-SCHEDULER-EARLIEST-START:{format_utc(flexibility.earliest_start)}",
+            f"X-SCHEDULER-DEADLINE:{format_utc(flexibility.deadline)}",
+            f"X-SCHEDULER-DURATION:{flexibility.duration}"
+        ]
+    preferred_time = (rule or flexibility).preferred_time if rule or flexibility else None
+    if preferred_time:
+        lines.append(f"X-SCHEDULER-PREFERRED-TIME:{escape_text(preferred_time)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) + "\r\n" for line in lines)
+
+
+def _lines(stream):
+    """Yield the lines of a binary UTF-8 stream, reading and decoding it in blocks."""
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    while True:
+        block = stream.read(READ_SIZE)
+        if not block:
+            break
+        lines = (pending + decoder.decode(block)).split("\n")
+        pending = lines.pop()
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _unfold(stream):
+    current = None
+    for line in _lines(stream):
+        line = line.rstrip("\r")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def parse_content_line(line):
+    """Split 'NAME;PARAM=VALUE:value' into (NAME, {PARAM: VALUE}, value)."""
+    head, _, value = line.partition(":")
+    if ";" not in head:
+        return head.upper(), {}, value
+    if '"' in head:
+        # A quoted parameter value may hold ':' itself
+        quoted = False
+        for position, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                head, value = line[:position], line[position + 1:]
+                break
+    name, *params = head.split(";")
+    return name.upper(), dict(param.split("=", 1) for param in params if "=" in param), value
+
+
+def read_vevents(stream):
+    """Yield the properties of each VEVENT in an iCalendar stream, one event at a time.
+
+    ``stream`` is a binary file-like object such as a request body; it is
+    read in blocks and only the current event is held in memory. Properties
+    map a name to its (params, value) pairs; components nested in an event,
+    like VALARM, are skipped.
+    """
+    properties = None
+    nested = 0
+    for line in _unfold(stream):
+        if not line:
+            continue
+        name, params, value = parse_content_line(line)
+        if name == "BEGIN":
+            if properties is not None:
+                nested += 1
+            elif value.upper() == "VEVENT":
+                properties = {}
+        elif name == "END":
+            if properties is None:
+                continue
+            if nested:
+                nested -= 1
+            elif value.upper() == "VEVENT":
+                yield properties
+                properties = None
+        elif properties is not None and not nested:
+            properties.setdefault(name, []).append((params, value))
+
+
+def vevent_item(properties):
+    """Turn a parsed VEVENT into a POST /events/batch item and its VEventInfo.
+
+    Datetimes in the item are already parsed. Raises ValueError for events
+    the scheduler cannot represent.
+    """
+    def first(name):
+        values = properties.get(name)
+        return values[0] if values else ({}, None)
+
+    start_params, start_value = first("DTSTART")
+    if start_value is None:
+        raise ValueError("DTSTART is missing")
+    start = parse_ics_datetime(start_value, start_params)
+    end_params, end_value = first("DTEND")
+    if end_value is not None:
+        end = parse_ics_datetime(end_value, end_params)
+    elif first("DURATION")[1] is not None:
+        end = start + parse_ics_duration(first("DURATION")[1])
+    else:
+        raise ValueError("DTEND or DURATION is missing")
+    if end <= start:
+        raise ValueError("The event ends before it starts")
+
+    item = {
+        "title": unescape_text(first("SUMMARY")[1] or "") or "Untitled",
+        "priority": scheduler_priority(first("PRIORITY")[1])
+    }
+    event_type = first("X-SCHEDULER-TYPE")[1]
+    preferred_time = unescape_text(first("X-SCHEDULER-PREFERRED-TIME")[1] or "") or None
+    duration = int((end - start).total_seconds() // 60)
+    rrule = first("RRULE")[1]
+    if rrule is not None:
+        frequency, count, until = parse_rrule(rrule, start)
+        item.update(
+            type="recurring_with_preferred_time" if preferred_time else "recurring_without_preferred_time",
+            duration=duration,
+            frequency=frequency,
+            start_date=start
+        )
+        if count is not None:
+            item["end_date"] = start + timedelta(days=frequency * (count - 1))
+        elif until is not None:
+            item["end_date"] = until
+    elif event_type and event_type.startswith("flexible"):
+        # Without its window the event may only stay where it is
+        earliest_start = first("X-SCHEDULER-EARLIEST-START")[1]
+        deadline = first("X-SCHEDULER-DEADLINE")[1]
+        item.update(
+            type=event_type,
+            duration=first("X-SCHEDULER-DURATION")[1] or duration,
+            earliest_start=parse_ics_datetime(earliest_start) if earliest_start else start,
+            deadline=parse_ics_datetime(deadline) if deadline else end,
+            start=start
+        )
+    else:
+        item.update(type="fixed", start=start, end=end)
+    if preferred_time:
+        item["preferred_time"] = preferred_time
+
+    params, value = first("RECURRENCE-ID")
+    recurrence_id = parse_ics_datetime(value, params) if value is not None else None
+    exdates = [
+        parse_ics_datetime(moment, params)
+        for params, values in properties.get("EXDATE", ())
+        for moment in values.split(",")
+    ]
+    return item, VEventInfo(first("UID")[1], recurrence_id, exdates)
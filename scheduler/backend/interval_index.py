@@ -0,0 +1,112 @@
+import bisect
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import itemgetter
+
+
+class IntervalIndex:
+    """Index of half-open [start, end) intervals sorted by (start, key).
+
+    Overlap queries bisect into the sorted starts and only look at entries
+    that start within ``max_span`` before the query window, so a lookup costs
+    O(log n + k) for calendars whose events have bounded length. Keys must be
+    mutually comparable; they break ties between equal starts.
+    """
+
+    def __init__(self):
+        self._order = []
+        self._entries = []
+        self._by_key = {}
+        self._span_counts = {}
+        self._max_span = timedelta(0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def add(self, key, start, end, item=None):
+        """Insert an interval, replacing any interval already stored under key."""
+        if key in self._by_key:
+            self.remove(key)
+        entry = (start, end, key, item)
+        pos = bisect.bisect_left(self._order, (start, key))
+        self._order.insert(pos, (start, key))
+        self._entries.insert(pos, entry)
+        self._by_key[key] = entry
+
+        span = end - start
+        self._span_counts[span] = self._span_counts.get(span, 0) + 1
+        if span > self._max_span:
+            self._max_span = span
+
+    def remove(self, key):
+        """Remove the interval stored under key. Returns False if it is missing."""
+        entry = self._by_key.pop(key, None)
+        if entry is None:
+            return False
+        start, end = entry[0], entry[1]
+        pos = bisect.bisect_left(self._order, (start, key))
+        del self._order[pos]
+        del self._entries[pos]
+
+        span = end - start
+        count = self._span_counts[span] - 1
+        if count:
+            self._span_counts[span] = count
+        else:
+            del self._span_counts[span]
+            if span == self._max_span:
+                self._max_span = max(self._span_counts, default=timedelta(0))
+        return True
+
+    def clear(self):
+        self._order.clear()
+        self._entries.clear()
+        self._by_key.clear()
+        self._span_counts.clear()
+        self._max_span = timedelta(0)
+
+    def load(self, intervals):
+        """Replace the contents with (key, start, end, item) tuples, sorting once."""
+        entries = {key: (start, end, key, item) for key, start, end, item in intervals}
+        self._entries = sorted(entries.values(), key=itemgetter(0, 2))
+        self._order = [(entry[0], entry[2]) for entry in self._entries]
+        self._by_key = entries
+        self._span_counts = {}
+        for start, end, _, _ in self._entries:
+            span = end - start
+            self._span_counts[span] = self._span_counts.get(span, 0) + 1
+        self._max_span = max(self._span_counts, default=timedelta(0))
+
+    def _iter_overlapping(self, start, end, after=None):
+        # Clamped so that starts near datetime.min do not overflow
+        lower = start - self._max_span if start - datetime.min > self._max_span else datetime.min
+        lo = bisect.bisect_left(self._order, (lower,))
+        if after is not None:
+            lo = max(lo, bisect.bisect_right(self._order, after))
+        hi = bisect.bisect_left(self._order, (end,))
+        for pos in range(lo, hi):
+            entry = self._entries[pos]
+            if entry[1] > start and entry[1] > entry[0]:
+                yield entry
+
+    def overlaps(self, start, end):
+        """Return True if any stored interval overlaps [start, end)."""
+        for _ in self._iter_overlapping(start, end):
+            return True
+        return False
+
+    def overlapping(self, start, end):
+        """Return the items of all intervals overlapping [start, end), by start."""
+        return [entry[3] for entry in self._iter_overlapping(start, end)]
+
+    def page(self, start, end, after=None, limit=None):
+        """Return items overlapping [start, end) that sort after the (start, key) cursor."""
+        entries = islice(self._iter_overlapping(start, end, after), limit)
+        return [entry[3] for entry in entries]
+
+    def intervals(self, start, end):
+        """Return (start, end) pairs of all intervals overlapping [start, end)."""
+        return [(entry[0], entry[1]) for entry in self._iter_overlapping(start, end)]
@@ -0,0 +1,97 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from timeutils import format_datetime, utc_now
+
+FINISHED = ("succeeded", "failed", "conflict")
+
+
+class JobConflict(Exception):
+    """The data a job worked from changed before it could commit."""
+
+
+class Job:
+    """A unit of background work and what is known about it so far.
+
+    ``status`` moves from "queued" to "running" and ends as "succeeded",
+    "failed" or "conflict". The work updates ``progress`` as it goes and its
+    return value becomes ``result``.
+    """
+
+    def __init__(self, kind, calendar_id):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.calendar_id = calendar_id
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created = utc_now()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "calendar": self.calendar_id,
+            "status": self.status,
+            "progress": self.progress,
+            "created": format_datetime(self.created),
+            "started": format_datetime(self.started),
+            "finished": format_datetime(self.finished)
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobRunner:
+    """Runs jobs on a thread pool and keeps the latest ``capacity`` for polling.
+
+    Jobs live in this process only; a restart forgets them.
+    """
+
+    def __init__(self, workers=2, capacity=1000, logger=None):
+        self.capacity = capacity
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, calendar_id, work):
+        """Queue work(job) and return its job right away."""
+        job = Job(kind, calendar_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs once over capacity
+            for old_id in [old.id for old in self._jobs.values() if old.status in FINISHED]:
+                if len(self._jobs) <= self.capacity:
+                    break
+                del self._jobs[old_id]
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _run(self, job, work):
+        job.started = utc_now()
+        job.status = "running"
+        result = error = None
+        try:
+            result = work(job)
+            status = "succeeded"
+        except JobConflict as e:
+            error, status = str(e), "conflict"
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.exception("Job %s failed", job.id)
+            error, status = str(e), "failed"
+        # Set status last so a poller seeing a finished job also sees its outcome
+        job.result, job.error, job.finished = result, error, utc_now()
+        job.status = status
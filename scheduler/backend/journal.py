@@ -0,0 +1,224 @@
+import io
+import mmap
+import os
+import pickle
+import re
+import struct
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: the directory is then not locked
+    fcntl = None
+
+from models import Event, Flexibility, Recurrence
+
+SNAPSHOT_MAGIC = b"SCHSNAP1"
+# Every log frame and snapshot payload is prefixed by its length and CRC-32
+FRAME = struct.Struct("<II")
+FILE_NAME = re.compile(r"(snapshot|log)-(\d{8})\.bin")
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler for journal data: plain values and datetimes, nothing executable."""
+
+    def find_class(self, module, name):
+        if (module, name) == ("datetime", "datetime"):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Unexpected object in journal: {module}.{name}")
+
+
+def _dumps(value):
+    return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _frame(payload):
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_event(event):
+    """Flatten an event into a tuple of plain values."""
+    rule = event.recurrence
+    flexibility = event.flexibility
+    return (
+        event.id, event.title, event.priority, event.type, event.start, event.end,
+        event.parent_id, event.occurrence,
+        (rule.anchor, rule.frequency, rule.duration, rule.count, rule.preferred_time,
+         tuple(rule.skipped), tuple(rule.displaced)) if rule is not None else None,
+        (flexibility.earliest_start, flexibility.deadline, flexibility.duration,
+         flexibility.preferred_time) if flexibility is not None else None
+    )
+
+
+def decode_event(record):
+    rule = record[8]
+    flexibility = record[9]
+    return Event(
+        id=record[0],
+        title=record[1],
+        priority=record[2],
+        type=record[3],
+        start=record[4],
+        end=record[5],
+        parent_id=record[6],
+        occurrence=record[7],
+        recurrence=Recurrence(
+            anchor=rule[0],
+            frequency=rule[1],
+            duration=rule[2],
+            count=rule[3],
+            preferred_time=rule[4],
+            skipped=set(rule[5]),
+            displaced=set(rule[6])
+        ) if rule is not None else None,
+        flexibility=Flexibility(*flexibility) if flexibility is not None else None
+    )
+
+
+def _fsync_directory(directory):
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_snapshot(path):
+    """Return the (last_id, records) stored in a snapshot file, mapping it when possible."""
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            data = io.BytesIO(f.read())
+        with data:
+            header = data.read(len(SNAPSHOT_MAGIC) + FRAME.size)
+            if len(header) < len(SNAPSHOT_MAGIC) + FRAME.size or not header.startswith(SNAPSHOT_MAGIC):
+                raise ValueError(f"Not a snapshot: {path}")
+            length, crc = FRAME.unpack_from(header, len(SNAPSHOT_MAGIC))
+            start = len(header)
+            view = data.getbuffer() if isinstance(data, io.BytesIO) else memoryview(data)
+            try:
+                if len(view) < start + length or zlib.crc32(view[start:start + length]) != crc:
+                    raise ValueError(f"Corrupt snapshot: {path}")
+            finally:
+                view.release()
+            return _Unpickler(data).load()
+
+
+class Journal:
+    """Snapshots and operation log of one store, kept in a directory.
+
+    Files come in generations: ``snapshot-N.bin`` holds every record as of the
+    start of ``log-N.bin``, which holds the operations since, one frame per
+    transaction. A frame cut short by a crash fails its CRC and is dropped
+    when the log is read, along with anything after it. The log is only open
+    while a frame is appended, so an idle journal holds no descriptor but its
+    lock file. Frames reach the OS as they are written and are fsynced when
+    the log is rotated, so a crash of the process loses nothing that
+    committed, while a power loss may lose the last transactions (like
+    SQLite's synchronous=NORMAL).
+
+    The directory is locked while a Journal has it open, so only one
+    process at a time can use it.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.generation = 0
+        self._lock_file = open(os.path.join(directory, "LOCK"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                raise RuntimeError(f"{directory} is in use by another process") from None
+
+    def _path(self, kind, generation):
+        return os.path.join(self.directory, f"{kind}-{generation:08d}.bin")
+
+    def _generations(self, kind):
+        found = []
+        for name in os.listdir(self.directory):
+            match = FILE_NAME.fullmatch(name)
+            if match and match.group(1) == kind:
+                found.append(int(match.group(2)))
+        return sorted(found)
+
+    def _read_log(self, generation):
+        """Yield the operation lists of a log, truncating it after its last intact frame."""
+        path = self._path("log", generation)
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + FRAME.size <= len(data):
+            length, crc = FRAME.unpack_from(data, offset)
+            payload = data[offset + FRAME.size:offset + FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            yield _Unpickler(io.BytesIO(payload)).load()
+            offset += FRAME.size + length
+        if offset < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+
+    def load(self):
+        """Read the latest snapshot and replay the logs after it.
+
+        Returns the stored records, the last id handed out and the number of
+        operations replayed.
+        """
+        snapshots = self._generations("snapshot")
+        base = snapshots[-1] if snapshots else 0
+        last_id, records = read_snapshot(self._path("snapshot", base)) if snapshots else (0, [])
+        records = {record[0]: record for record in records}
+
+        replayed = 0
+        logs = [generation for generation in self._generations("log") if generation >= base]
+        for generation in logs:
+            for ops in self._read_log(generation):
+                for op, value in ops:
+                    if op == "put":
+                        records[value[0]] = value
+                    elif op == "del":
+                        records.pop(value, None)
+                    else:
+                        last_id = max(last_id, value)
+                replayed += len(ops)
+
+        self.generation = logs[-1] if logs else base
+        return list(records.values()), max(last_id, max(records, default=0)), replayed
+
+    def append(self, ops):
+        """Log one transaction's operations as a single frame."""
+        with open(self._path("log", self.generation), "ab") as log:
+            log.write(_frame(_dumps(ops)))
+
+    def rotate(self):
+        """Sync the current log and start the next generation; return its number."""
+        path = self._path("log", self.generation)
+        if os.path.exists(path):
+            with open(path, "rb+") as log:
+                os.fsync(log.fileno())
+        self.generation += 1
+        return self.generation
+
+    def write_snapshot(self, generation, last_id, records):
+        """Write the snapshot a rotation started, then delete the files it replaces."""
+        path = self._path("snapshot", generation)
+        with open(path + ".tmp", "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_frame(_dumps((last_id, records))))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_directory(self.directory)
+        for kind in ("snapshot", "log"):
+            for old in self._generations(kind):
+                if old < generation:
+                    os.remove(self._path(kind, old))
+
+    def close(self):
+        self._lock_file.close()
@@ -0,0 +1,133 @@
+import bisect
+import os
+import threading
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        """Add amount; ``labels`` are the label values in declaration order."""
+        if not self.registry.enabled or not amount:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, per label values."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+
+class Registry:
+    """The metrics of the process, rendered in the Prometheus text format.
+
+    While disabled, updates return right away and nothing is recorded.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(self, name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self, name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# SCHEDULER_METRICS=0 turns instrumentation off
+REGISTRY = Registry(enabled=os.environ.get("SCHEDULER_METRICS", "1") != "0")
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "scheduler_request_duration_seconds", "Time spent handling requests.", ("method", "endpoint", "status")
+)
+CONFLICT_CHECKS = REGISTRY.counter("scheduler_conflict_checks_total", "Conflict checks for new events.")
+SLOT_SEARCHES = REGISTRY.counter("scheduler_slot_searches_total", "Free slot searches.", ("backend",))
+SLOT_PROBES = REGISTRY.counter(
+    "scheduler_slot_probes_total", "Free gaps examined by timeline slot searches."
+)
+DATETIME_PARSES = REGISTRY.counter("scheduler_parse_datetime_total", "Datetime strings parsed.")
+RESCHEDULED_EVENTS = REGISTRY.counter(
+    "scheduler_reschedule_events_total", "Events handled by /reschedule.", ("mode", "outcome")
+)
+RESPONSE_CACHE = REGISTRY.counter(
+    "scheduler_response_cache_total", "Cacheable read requests by outcome.", ("outcome",)
+)
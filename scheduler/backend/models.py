@@ -0,0 +1,199 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from timeutils import format_datetime, parse_datetime, parse_preferred_time
+
+# Occurrence indexes per series; bounds the ids handed out to virtual occurrences
+MAX_OCCURRENCES = 100000
+
+
+def occurrence_id(parent_id, index):
+    """Id of a virtual occurrence; negative so it never collides with stored ids."""
+    return -(parent_id * MAX_OCCURRENCES + index + 1)
+
+
+def split_occurrence_id(event_id):
+    """Return the (parent_id, index) pair encoded by occurrence_id."""
+    return divmod(-event_id - 1, MAX_OCCURRENCES)
+
+
+@dataclass(slots=True)
+class Recurrence:
+    """Rule of a recurring series: ``count`` occurrences, ``frequency`` days apart.
+
+    Occurrences sit at their nominal slot (the preferred start, or the anchor's
+    time of day) and are generated on demand. Only indexes that are off their
+    nominal slot are recorded: ``displaced`` ones were moved to a stored
+    override instance or could not be placed, ``skipped`` ones were deleted.
+    """
+
+    anchor: datetime
+    frequency: int
+    duration: int
+    count: int
+    preferred_time: Optional[str] = None
+    skipped: set = field(default_factory=set)
+    displaced: set = field(default_factory=set)
+    first_start: datetime = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.preferred_time:
+            window = parse_preferred_time(self.preferred_time)
+            self.first_start = datetime.combine(self.anchor.date(), window.start)
+        else:
+            self.first_start = self.anchor
+
+    @property
+    def period(self):
+        return timedelta(days=self.frequency)
+
+    @property
+    def length(self):
+        return timedelta(minutes=self.duration)
+
+    def day(self, index):
+        """Datetime within the day the index-th occurrence belongs to."""
+        return self.anchor + index * self.period
+
+    def nominal_slot(self, index):
+        start = self.first_start + index * self.period
+        return start, start + self.length
+
+    def span(self):
+        """The [start, end) range covered by the nominal slots of the whole series."""
+        return self.first_start, self.first_start + (self.count - 1) * self.period + self.length
+
+    def indexes(self, start, end):
+        """Return the range of indexes whose nominal slot overlaps [start, end)."""
+        first = max(0, (start - self.first_start - self.length) // self.period + 1)
+        last = min(self.count, -((self.first_start - end) // self.period))
+        return range(first, max(first, last))
+
+    def occurrences(self, start, end):
+        """Yield (index, start, end) for the occurrences at their nominal slot in [start, end)."""
+        for index in self.indexes(start, end):
+            if index in self.skipped or index in self.displaced:
+                continue
+            slot_start, slot_end = self.nominal_slot(index)
+            yield index, slot_start, slot_end
+
+    def to_dict(self):
+        return {
+            "start_date": format_datetime(self.anchor),
+            "frequency": self.frequency,
+            "duration": self.duration,
+            "count": self.count,
+            "preferred_time": self.preferred_time,
+            "skipped": sorted(self.skipped),
+            "displaced": sorted(self.displaced)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            anchor=parse_datetime(data["start_date"]),
+            frequency=int(data["frequency"]),
+            duration=int(data["duration"]),
+            count=int(data["count"]),
+            preferred_time=data.get("preferred_time"),
+            skipped=set(data.get("skipped", ())),
+            displaced=set(data.get("displaced", ()))
+        )
+
+
+@dataclass(slots=True)
+class Flexibility:
+    """Constraints of a flexible event, kept so it can be placed again later."""
+
+    earliest_start: datetime
+    deadline: datetime
+    duration: int
+    preferred_time: Optional[str] = None
+
+    @property
+    def length(self):
+        return timedelta(minutes=self.duration)
+
+    def to_dict(self):
+        return {
+            "earliest_start": format_datetime(self.earliest_start),
+            "deadline": format_datetime(self.deadline),
+            "duration": self.duration,
+            "preferred_time": self.preferred_time
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            earliest_start=parse_datetime(data["earliest_start"]),
+            deadline=parse_datetime(data["deadline"]),
+            duration=int(data["duration"]),
+            preferred_time=data.get("preferred_time")
+        )
+
+
+@dataclass(slots=True)
+class Event:
+    """A stored calendar event with its time slot parsed once at ingest.
+
+    Recurring parents are untimed and carry a ``recurrence`` rule; their
+    instances have ``parent_id`` and ``occurrence`` set. Flexible events keep
+    the window they may move in as ``flexibility``.
+    """
+
+    id: int
+    title: str
+    priority: str
+    type: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    parent_id: Optional[int] = None
+    occurrence: Optional[int] = None
+    recurrence: Optional[Recurrence] = None
+    flexibility: Optional[Flexibility] = None
+
+    @property
+    def is_timed(self):
+        return self.start is not None and self.end is not None
+
+    def instance(self, index, start, end):
+        """Build the occurrence of this recurring parent at the given slot."""
+        return Event(
+            id=occurrence_id(self.id, index),
+            title=self.title,
+            priority=self.priority,
+            type="recurring_instance",
+            start=start,
+            end=end,
+            parent_id=self.id,
+            occurrence=index
+        )
+
+    def occurrences(self, start, end):
+        """Yield the virtual instances of this series overlapping [start, end), by start."""
+        if self.recurrence is None:
+            return
+        for index, slot_start, slot_end in self.recurrence.occurrences(start, end):
+            yield self.instance(index, slot_start, slot_end)
+
+    def to_dict(self):
+        """Serialize to the JSON shape served by the API."""
+        data = {
+            "id": self.id,
+            "title": self.title,
+            "priority": self.priority,
+            "type": self.type
+        }
+        if self.is_timed:
+            data["start"] = format_datetime(self.start)
+            data["end"] = format_datetime(self.end)
+        if self.parent_id is not None:
+            data["parent_id"] = self.parent_id
+        if self.occurrence is not None:
+            data["occurrence"] = self.occurrence
+        if self.recurrence is not None:
+            data["recurrence"] = self.recurrence.to_dict()
+        if self.flexibility is not None:
+            data["flexibility"] = self.flexibility.to_dict()
+        return data
@@ -0,0 +1,25 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(event, ranged):
+    """Encode the keyset position of the last event on a page as an opaque token.
+
+    Ranged listings are ordered by (start, id), the full listing by id alone.
+    """
+    raw = f"{event.start.isoformat()}|{event.id}" if ranged else str(event.id)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token, ranged):
+    """Turn a token from encode_cursor back into a store ``after`` argument."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token.encode()).decode()
+        if not ranged:
+            return int(raw)
+        start, event_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(start), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {token}")
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ResponseCache:
+    """Serialized read responses of one calendar, evicted least recently used first.
+
+    Each entry keeps the ETag it was built under and only a lookup with that
+    same ETag hits, so an entry can never be served for another store
+    version. ``record`` is a store listener that empties the cache on every
+    mutation, so bodies of past versions do not hold memory.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, etag):
+        """Return the (body, headers) cached for key under etag, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, etag, body, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self._entries[key] = (etag, body, headers)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def record(self, op, event):
+        """Drop every entry; they describe the store before this mutation."""
+        if self._entries:
+            with self._lock:
+                self._entries.clear()
+                self.size = 0
@@ -0,0 +1,126 @@
+import bisect
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from metrics import SLOT_PROBES, SLOT_SEARCHES
+
+
+def merge_intervals(intervals):
+    """Merge (start, end) pairs sorted by start into disjoint busy blocks."""
+    merged = []
+    for start, end in intervals:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def align(moment, step, anchor):
+    """Round moment up to the next point on the grid anchor + k * step."""
+    if not step:
+        return moment
+    offset = (moment - anchor) % step
+    if not offset:
+        return moment
+    # Past the last representable time nothing fits anyway
+    return moment + (step - offset) if datetime.max - moment >= step - offset else datetime.max
+
+
+class BusyTimeline:
+    """Disjoint busy blocks inside a window, walked gap by gap to find free slots.
+
+    Building the timeline merges the busy intervals once; every slot query then
+    costs O(log b + g) for b busy blocks and g gaps visited, independent of how
+    long the searched window is.
+    """
+
+    def __init__(self, intervals=()):
+        merged = merge_intervals(intervals)
+        self._starts = [block[0] for block in merged]
+        self._ends = [block[1] for block in merged]
+
+    @classmethod
+    def union(cls, *interval_lists):
+        """Build the timeline of the time busy in any of several sorted interval lists.
+
+        The lists are combined with a k-way heap merge, O(n log k) for n
+        intervals from k lists.
+        """
+        return cls(heapq.merge(*interval_lists))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, start, end):
+        """Mark [start, end) as busy, merging it with touching blocks."""
+        if end <= start:
+            return
+        lo = bisect.bisect_left(self._ends, start)
+        hi = bisect.bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def is_free(self, start, end):
+        """Return True if no busy block overlaps [start, end)."""
+        pos = bisect.bisect_right(self._ends, start)
+        return pos == len(self._starts) or self._starts[pos] >= end
+
+    def busy(self, start_time, end_time):
+        """Yield the busy blocks overlapping [start_time, end_time), clipped to it."""
+        pos = bisect.bisect_right(self._ends, start_time)
+        while pos < len(self._starts) and self._starts[pos] < end_time:
+            yield max(self._starts[pos], start_time), min(self._ends[pos], end_time)
+            pos += 1
+
+    def gaps(self, start_time, end_time):
+        """Yield the free (start, end) gaps inside [start_time, end_time)."""
+        cursor = start_time
+        pos = bisect.bisect_right(self._ends, start_time)
+        while pos < len(self._starts) and self._starts[pos] < end_time:
+            if self._starts[pos] > cursor:
+                yield cursor, self._starts[pos]
+            cursor = max(cursor, self._ends[pos])
+            pos += 1
+        if cursor < end_time:
+            yield cursor, end_time
+
+    def iter_slots(self, start_time, end_time, duration, step=None, anchor=None):
+        """Yield feasible (start, end) slots of the given duration in time order.
+
+        With a step, every grid-aligned start in every gap is yielded, the grid
+        being anchored at ``anchor`` (default ``start_time``). Without a step,
+        only the earliest slot of each gap is yielded.
+        """
+        if anchor is None:
+            anchor = start_time
+        SLOT_SEARCHES.inc(labels=("timeline",))
+        probes = 0
+        try:
+            for gap_start, gap_end in self.gaps(start_time, end_time):
+                probes += 1
+                slot_start = align(gap_start, step, anchor)
+                # Compared as differences so that slots near datetime.max do not overflow
+                while gap_end - slot_start >= duration:
+                    yield slot_start, slot_start + duration
+                    if not step or gap_end - slot_start < step + duration:
+                        break
+                    slot_start += step
+        finally:
+            # Counted once per search, also when the caller stops early
+            SLOT_PROBES.inc(probes)
+
+    def first_slot(self, start_time, end_time, duration, step=None, anchor=None):
+        """Return the earliest feasible slot, or None if nothing fits."""
+        return next(self.iter_slots(start_time, end_time, duration, step, anchor), None)
+
+    def find_slots(self, start_time, end_time, duration, step=None, anchor=None, limit=None):
+        """Return up to limit feasible slots (all of them when limit is None)."""
+        return list(islice(self.iter_slots(start_time, end_time, duration, step, anchor), limit))
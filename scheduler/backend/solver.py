@@ -0,0 +1,261 @@
+import heapq
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from interval_index import IntervalIndex
+from slots import align
+
+PRIORITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+
+
+@dataclass(slots=True)
+class Task:
+    """A block of ``duration`` to place inside [earliest, deadline).
+
+    ``preferred`` windows are tried, in order, before the rest of the window.
+    """
+
+    duration: timedelta
+    earliest: datetime
+    deadline: datetime
+    weight: int = 1
+    preferred: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Solution:
+    """Slots chosen per task index, with the objective they reach."""
+
+    slots: dict
+    placed: int
+    weighted: int
+    timed_out: bool
+
+    def objective(self):
+        return {"placed": self.placed, "weighted_priority": self.weighted}
+
+
+class Solver:
+    """Interval scheduling with deadlines and priorities under a time budget.
+
+    Two constructions seed the search, earliest deadline first and highest
+    priority first, each putting tasks in the earliest free slot of their
+    preferred windows and then of their whole window. The better one is
+    improved with ejection chains: an unplaced task takes a slot from placed
+    tasks, which are placed again elsewhere, up to ``depth`` levels deep. A
+    change is kept only if it raises the weighted priority of the placed tasks
+    (or, at equal weight, the number placed). Fixed busy time comes from the
+    ``timeline``; slot starts sit on the ``step`` grid of each window.
+    """
+
+    def __init__(self, timeline, tasks, step=None, budget=1.0, depth=2, max_candidates=16):
+        self.timeline = timeline
+        self.tasks = tasks
+        self.step = step
+        self.budget = budget
+        self.depth = depth
+        self.max_candidates = max_candidates
+
+    def solve(self):
+        self._expires = time.monotonic() + self.budget
+        self._timed_out = False
+
+        best = None
+        for order in (self._by_deadline(), self._by_priority()):
+            self._reset()
+            for index in order:
+                slot = self._first_free(index)
+                if slot:
+                    self._place(index, slot)
+            if best is None or self._score() > best[0]:
+                best = self._score(), dict(self._slots)
+
+        self._reset(best[1])
+        self._improve()
+        return self._solution()
+
+    def repair(self, slots):
+        """Keep the placements in ``slots`` and fit the other tasks in around them.
+
+        Placed tasks only move when an ejection chain needs their slot, and
+        then to the first free slot of their own window, so an existing plan
+        changes as little as possible.
+        """
+        self._expires = time.monotonic() + self.budget
+        self._timed_out = False
+        self._reset(slots)
+        for index in self._by_priority():
+            if index in self._slots or self._expired():
+                continue
+            self._journal.clear()
+            self._insert(index, self.depth, frozenset())
+        return self._solution()
+
+    def compact(self, slots):
+        """Move each task placed in ``slots`` to its first free slot if that ranks better.
+
+        Tasks go highest weight first, then by start. A slot ranks better if
+        it lies in an earlier preferred window, or starts earlier in the same one.
+        """
+        self._expires = time.monotonic() + self.budget
+        self._timed_out = False
+        self._reset(slots)
+        for index in sorted(slots, key=lambda i: (-self.tasks[i].weight, slots[i])):
+            if self._expired():
+                break
+            slot = self._slots[index]
+            self._unplace(index)
+            better = self._first_free(index)
+            if better is None or self._rank(index, better) >= self._rank(index, slot):
+                better = slot
+            self._place(index, better)
+        return self._solution()
+
+    def _solution(self):
+        return Solution(
+            slots=dict(self._slots),
+            placed=len(self._slots),
+            weighted=self._weighted,
+            timed_out=self._timed_out
+        )
+
+    def _by_deadline(self):
+        tasks = self.tasks
+        return sorted(range(len(tasks)), key=lambda i: (tasks[i].deadline, -tasks[i].weight, tasks[i].earliest))
+
+    def _by_priority(self):
+        tasks = self.tasks
+        return sorted(range(len(tasks)), key=lambda i: (-tasks[i].weight, tasks[i].deadline, tasks[i].earliest))
+
+    def _expired(self):
+        if not self._timed_out and time.monotonic() > self._expires:
+            self._timed_out = True
+        return self._timed_out
+
+    def _reset(self, slots=None):
+        self._slots = {}
+        self._placed = IntervalIndex()
+        self._weighted = 0
+        self._journal = []
+        for index, slot in (slots or {}).items():
+            self._place(index, slot)
+        self._journal.clear()
+
+    def _score(self):
+        return self._weighted, len(self._slots)
+
+    def _place(self, index, slot):
+        self._slots[index] = slot
+        self._placed.add(index, slot[0], slot[1], index)
+        self._weighted += self.tasks[index].weight
+        self._journal.append((True, index, slot))
+
+    def _unplace(self, index):
+        slot = self._slots.pop(index)
+        self._placed.remove(index)
+        self._weighted -= self.tasks[index].weight
+        self._journal.append((False, index, slot))
+
+    def _rollback(self, mark):
+        """Undo every placement change made since the journal had ``mark`` entries."""
+        while len(self._journal) > mark:
+            placed, index, slot = self._journal.pop()
+            if placed:
+                self._unplace(index)
+            else:
+                self._place(index, slot)
+            self._journal.pop()
+
+    def _free_gaps(self, start, end):
+        """Yield the gaps in [start, end) left by both the timeline and placed tasks."""
+        for gap_start, gap_end in self.timeline.gaps(start, end):
+            cursor = gap_start
+            for busy_start, busy_end in self._placed.intervals(gap_start, gap_end):
+                if busy_start > cursor:
+                    yield cursor, busy_start
+                cursor = max(cursor, busy_end)
+            if cursor < gap_end:
+                yield cursor, gap_end
+
+    def _rank(self, index, slot):
+        task = self.tasks[index]
+        for position, (window_start, window_end) in enumerate(task.preferred):
+            if window_start <= slot[0] and slot[1] <= window_end:
+                return position, slot[0]
+        return len(task.preferred), slot[0]
+
+    def _first_free(self, index):
+        task = self.tasks[index]
+        for window_start, window_end in task.preferred + [(task.earliest, task.deadline)]:
+            for gap_start, gap_end in self._free_gaps(window_start, window_end):
+                slot_start = align(gap_start, self.step, window_start)
+                if slot_start + task.duration <= gap_end:
+                    return slot_start, slot_start + task.duration
+        return None
+
+    def _candidates(self, index, locked):
+        """Return the cheapest slots to take from placed tasks, as (cost, count, slot, blockers)."""
+        task = self.tasks[index]
+        candidates = []
+        for slot in self.timeline.iter_slots(task.earliest, task.deadline, task.duration, self.step):
+            blockers = self._placed.overlapping(*slot)
+            if not blockers or any(blocker in locked for blocker in blockers):
+                continue
+            cost = sum(self.tasks[blocker].weight for blocker in blockers)
+            candidates.append((cost, len(blockers), slot, blockers))
+        return heapq.nsmallest(self.max_candidates, candidates, key=lambda c: (c[0], c[1], c[2]))
+
+    def _insert(self, index, depth, locked):
+        """Place a task, moving placed tasks out of the way if needed; all of them must fit."""
+        slot = self._first_free(index)
+        if slot:
+            self._place(index, slot)
+            return True
+        if depth == 0 or self._expired():
+            return False
+
+        locked = locked | {index}
+        for _, _, slot, blockers in self._candidates(index, locked):
+            mark = len(self._journal)
+            for blocker in blockers:
+                self._unplace(blocker)
+            self._place(index, slot)
+            if all(self._insert(blocker, depth - 1, locked) for blocker in blockers):
+                return True
+            self._rollback(mark)
+            if self._expired():
+                break
+        return False
+
+    def _trade(self, index):
+        """Place a task over lighter ones, keeping the swap if the objective improves."""
+        before = self._score()
+        weight = self.tasks[index].weight
+        for cost, _, slot, blockers in self._candidates(index, {index}):
+            if cost >= weight or self._expired():
+                break
+            mark = len(self._journal)
+            for blocker in blockers:
+                self._unplace(blocker)
+            self._place(index, slot)
+            for blocker in blockers:
+                self._insert(blocker, self.depth - 1, {index})
+            if self._score() > before:
+                return True
+            self._rollback(mark)
+        return False
+
+    def _improve(self):
+        improved = True
+        while improved and not self._expired():
+            improved = False
+            unplaced = [index for index in self._by_priority() if index not in self._slots]
+            for index in unplaced:
+                if self._expired():
+                    break
+                if index in self._slots:
+                    continue
+                self._journal.clear()
+                if self._insert(index, self.depth, frozenset()) or self._trade(index):
+                    improved = True
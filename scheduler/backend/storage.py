@@ -0,0 +1,765 @@
+import bisect
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+from interval_index import IntervalIndex
+from journal import Journal, decode_event, encode_event
+from locks import RWLock
+from models import Event, Flexibility, Recurrence, split_occurrence_id
+
+DEFAULT_CALENDAR = "default"
+
+
+def _event_order(event):
+    return event.start, event.id
+
+
+class EventStore:
+    """Interface shared by the event storage backends.
+
+    Time-range methods use half-open [start, end) windows and return timed
+    events ordered by (start, id). They merge stored events with the virtual
+    occurrences of recurring series, which are generated for the queried
+    window only and carry negative ids. Untimed events (recurring parents) are
+    only reachable through ``get``, ``children`` and ``all``.
+
+    Reads hold a shared lock and writes an exclusive one, so concurrent
+    requests never see a half-applied write; use ``reading`` and
+    ``transaction`` to extend them over a sequence of calls.
+
+    Backends implement the underscored primitives over stored records.
+    """
+
+    def __init__(self):
+        self._listeners = []
+        self._immediate = []
+        self._lock = RWLock()
+        self._depth = 0
+        self._pending = []
+
+    def subscribe(self, listener, immediate=False):
+        """Call listener(op, event) after every mutation.
+
+        ``op`` is "created" for a new id, "updated" when an existing id is
+        stored again and "deleted" on removal. Listeners hear about writes
+        once the transaction making them commits. ``immediate`` listeners are
+        called as each write happens instead, so they can back reads made
+        later in the same transaction; if its writes are rolled back they get
+        op "rollback" with no event.
+        """
+        (self._immediate if immediate else self._listeners).append(listener)
+
+    def _notify(self, op, event):
+        for listener in self._immediate:
+            listener(op, event)
+        self._pending.append((op, event))
+
+    def reading(self):
+        """Hold the shared lock: reads run together, but never during a write."""
+        return self._lock.read()
+
+    @contextmanager
+    def transaction(self):
+        """Hold the exclusive lock over a check-then-write sequence.
+
+        Transactions nest. Listeners hear about the writes when the outermost
+        one ends; if it raises, backends that can roll back discard them.
+        """
+        with self._lock.write():
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+
+            # Only count the transaction as open once the backend has begun it
+            self._begin()
+            self._depth = 1
+            try:
+                yield
+                self._commit()
+            except BaseException:
+                if self._rollback():
+                    self._pending.clear()
+                    for listener in self._immediate:
+                        listener("rollback", None)
+                raise
+            finally:
+                self._depth = 0
+                pending, self._pending = self._pending, []
+                for op, event in pending:
+                    for listener in self._listeners:
+                        listener(op, event)
+
+    def _begin(self):
+        pass
+
+    def _commit(self):
+        pass
+
+    def _rollback(self):
+        """Undo the current transaction's writes; return False if they are kept."""
+        return False
+
+    def shared_version(self):
+        """Version of the data as other processes write it too, or None if only this one does."""
+        return None
+
+    def next_id(self):
+        """Return the next value of the monotonic event id sequence."""
+        with self.transaction():
+            return self._next_id()
+
+    def add(self, event):
+        """Store an event, replacing the stored event with the same id."""
+        with self.transaction():
+            existed = self._put(event)
+            self._notify("updated" if existed else "created", event)
+
+    def _next_id(self):
+        raise NotImplementedError
+
+    def _put(self, event):
+        """Write an event; return True if its id was already stored."""
+        raise NotImplementedError
+
+    def _remove(self, event_id):
+        """Delete a stored event and return it, or None if it is missing."""
+        raise NotImplementedError
+
+    def _get(self, event_id):
+        raise NotImplementedError
+
+    def _page(self, start, end, after=None, limit=None):
+        raise NotImplementedError
+
+    def _series(self, start, end):
+        """Return the recurring parents whose series span overlaps [start, end)."""
+        raise NotImplementedError
+
+    def _overlaps(self, start, end):
+        return bool(self._page(start, end, limit=1))
+
+    def _unplaced(self):
+        """Return the flexible events stored without a slot."""
+        raise NotImplementedError
+
+    def _all(self, after=None, limit=None):
+        raise NotImplementedError
+
+    def _instances(self, parent_id):
+        raise NotImplementedError
+
+    def all(self, after=None, limit=None):
+        """Return stored events ordered by id, starting after the given id."""
+        with self.reading():
+            return self._all(after, limit)
+
+    def children(self, parent_id):
+        """Return the stored instances of a recurring parent."""
+        with self.reading():
+            return self._instances(parent_id)
+
+    def get(self, event_id):
+        with self.reading():
+            if event_id < 0:
+                return self._get_occurrence(event_id)
+            return self._get(event_id)
+
+    def remove(self, event_id):
+        """Delete an event by id and return it, or None if it is missing.
+
+        Removing a virtual occurrence marks it skipped on its parent.
+        """
+        with self.transaction():
+            if event_id < 0:
+                return self._skip_occurrence(event_id)
+            event = self._remove(event_id)
+            if event is not None:
+                self._notify("deleted", event)
+            return event
+
+    def _get_occurrence(self, event_id):
+        parent_id, index = split_occurrence_id(event_id)
+        parent = self._get(parent_id)
+        if parent is None or parent.recurrence is None:
+            return None
+        rule = parent.recurrence
+        if not 0 <= index < rule.count or index in rule.skipped or index in rule.displaced:
+            return None
+        return parent.instance(index, *rule.nominal_slot(index))
+
+    def _skip_occurrence(self, event_id):
+        instance = self._get_occurrence(event_id)
+        if instance is None:
+            return None
+        parent = self._get(instance.parent_id)
+        parent.recurrence.skipped.add(instance.occurrence)
+        self.add(parent)
+        self._notify("deleted", instance)
+        return instance
+
+    def _expand(self, series, start, end, after=None):
+        """Merge the virtual occurrences of the given series by (start, id)."""
+        if after is not None:
+            start = max(start, after[0])
+        merged = heapq.merge(*(parent.occurrences(start, end) for parent in series), key=_event_order)
+        if after is not None:
+            merged = (event for event in merged if _event_order(event) > after)
+        return merged
+
+    def page(self, start, end, after=None, limit=None):
+        """Return up to limit events overlapping [start, end) ordered by (start, id).
+
+        ``after`` is a (start, id) keyset cursor taken from the last event of
+        the previous page.
+        """
+        with self.reading():
+            stored = self._page(start, end, after, limit)
+            series = self._series(start, end)
+            if not series:
+                return stored
+            merged = heapq.merge(stored, self._expand(series, start, end, after), key=_event_order)
+            return list(islice(merged, limit))
+
+    def overlapping(self, start, end):
+        """Return timed events overlapping [start, end)."""
+        return self.page(start, end)
+
+    def starting_in(self, start, end):
+        """Return timed events whose start lies in [start, end)."""
+        return [event for event in self.overlapping(start, end) if event.start >= start]
+
+    def unscheduled(self, start, end):
+        """Return the flexible events without a slot whose window overlaps [start, end)."""
+        with self.reading():
+            return [
+                event for event in self._unplaced()
+                if event.flexibility.earliest_start < end and start < event.flexibility.deadline
+            ]
+
+    def intervals(self, start, end):
+        """Return (start, end) pairs of the events overlapping [start, end)."""
+        return [(event.start, event.end) for event in self.overlapping(start, end)]
+
+    def overlaps(self, start, end):
+        with self.reading():
+            if self._overlaps(start, end):
+                return True
+            for _ in self._expand(self._series(start, end), start, end):
+                return True
+            return False
+
+
+class MemoryStore(EventStore):
+    """Process-local store backed by a dict and interval indexes."""
+
+    def __init__(self):
+        super().__init__()
+        self._events = {}
+        self._ids = []
+        self._children = {}
+        self._unscheduled = {}
+        self._index = IntervalIndex()
+        self._series_index = IntervalIndex()
+        self._sequence = itertools.count(1)
+
+    def __len__(self):
+        return len(self._events)
+
+    def _next_id(self):
+        return next(self._sequence)
+
+    def _put(self, event):
+        existing = self._events.get(event.id)
+        if existing is None:
+            bisect.insort(self._ids, event.id)
+        elif existing.parent_id != event.parent_id:
+            self._children.get(existing.parent_id, {}).pop(event.id, None)
+        self._events[event.id] = event
+        if event.parent_id is not None:
+            self._children.setdefault(event.parent_id, {})[event.id] = event
+        if event.is_timed:
+            self._index.add(event.id, event.start, event.end, event)
+            self._unscheduled.pop(event.id, None)
+        else:
+            self._index.remove(event.id)
+            if event.flexibility is not None:
+                self._unscheduled[event.id] = event
+        if event.recurrence is not None:
+            self._series_index.add(event.id, *event.recurrence.span(), event)
+        else:
+            self._series_index.remove(event.id)
+        return existing is not None
+
+    def _remove(self, event_id):
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return None
+        del self._ids[bisect.bisect_left(self._ids, event_id)]
+        if event.parent_id is not None:
+            siblings = self._children.get(event.parent_id)
+            if siblings is not None:
+                siblings.pop(event_id, None)
+                if not siblings:
+                    del self._children[event.parent_id]
+        self._index.remove(event_id)
+        self._series_index.remove(event_id)
+        self._unscheduled.pop(event_id, None)
+        return event
+
+    def _get(self, event_id):
+        return self._events.get(event_id)
+
+    def _all(self, after=None, limit=None):
+        pos = bisect.bisect_right(self._ids, after) if after is not None else 0
+        ids = self._ids[pos:pos + limit] if limit is not None else self._ids[pos:]
+        return [self._events[event_id] for event_id in ids]
+
+    def _instances(self, parent_id):
+        return list(self._children.get(parent_id, {}).values())
+
+    def _page(self, start, end, after=None, limit=None):
+        return self._index.page(start, end, after, limit)
+
+    def _series(self, start, end):
+        return self._series_index.overlapping(start, end)
+
+    def _overlaps(self, start, end):
+        return self._index.overlaps(start, end)
+
+    def _unplaced(self):
+        return [self._unscheduled[event_id] for event_id in sorted(self._unscheduled)]
+
+    def _load(self, events):
+        """Fill an empty store with events in bulk, building each index once."""
+        self._events = {event.id: event for event in events}
+        self._ids = sorted(self._events)
+        for event in self._events.values():
+            if event.parent_id is not None:
+                self._children.setdefault(event.parent_id, {})[event.id] = event
+            if event.flexibility is not None and not event.is_timed:
+                self._unscheduled[event.id] = event
+        self._index.load(
+            (event.id, event.start, event.end, event) for event in self._events.values() if event.is_timed
+        )
+        self._series_index.load(
+            (event.id, *event.recurrence.span(), event)
+            for event in self._events.values() if event.recurrence is not None
+        )
+
+
+class DurableStore(MemoryStore):
+    """Memory store kept on disk as snapshots plus an operation log.
+
+    Every transaction's writes go to the log as one frame when it ends, so
+    a crash never leaves half of a reschedule behind. After
+    ``snapshot_every`` logged operations the store is compacted in the
+    background: a snapshot of every event is written and the log starts
+    over. Opening the store maps the latest snapshot, replays the log after
+    it and builds the interval indexes in one pass each.
+    """
+
+    def __init__(self, directory, snapshot_every=50000):
+        super().__init__()
+        self.snapshot_every = snapshot_every
+        self._ops = []
+        self._compacting = threading.Lock()
+        self.journal = Journal(directory)
+        records, self._last_id, self._logged = self.journal.load()
+        self._logged_id = self._last_id
+        self._load([decode_event(record) for record in records])
+        if self._logged >= snapshot_every:
+            self._compact_in_background()
+
+    def _next_id(self):
+        self._last_id += 1
+        return self._last_id
+
+    def _put(self, event):
+        existed = super()._put(event)
+        self._ops.append(("put", encode_event(event)))
+        return existed
+
+    def _remove(self, event_id):
+        event = super()._remove(event_id)
+        if event is not None:
+            self._ops.append(("del", event_id))
+        return event
+
+    def _commit(self):
+        self._flush()
+
+    def _rollback(self):
+        # Writes to memory are kept, so they are logged as well
+        self._flush()
+        return False
+
+    def _flush(self):
+        if self._last_id != self._logged_id:
+            self._ops.append(("seq", self._last_id))
+            self._logged_id = self._last_id
+        if not self._ops:
+            return
+        ops, self._ops = self._ops, []
+        self.journal.append(ops)
+        self._logged += len(ops)
+        if self._logged >= self.snapshot_every:
+            self._compact_in_background()
+
+    def _compact_in_background(self):
+        if self._compacting.acquire(blocking=False):
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def compact(self):
+        """Write a snapshot of the store and start a new log."""
+        self._compacting.acquire()
+        self._compact()
+
+    def _compact(self):
+        try:
+            # Writers wait while the records are taken; the file is written without the lock
+            with self.reading():
+                records = [encode_event(event) for event in self._events.values()]
+                last_id = self._last_id
+                generation = self.journal.rotate()
+                self._logged = 0
+            self.journal.write_snapshot(generation, last_id, records)
+        finally:
+            self._compacting.release()
+
+    def close(self):
+        with self._lock.write():
+            self.journal.close()
+
+
+_TABLES = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    calendar_id TEXT NOT NULL DEFAULT 'default',
+    title TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    type TEXT NOT NULL,
+    start_at TEXT,
+    end_at TEXT,
+    parent_id INTEGER,
+    occurrence INTEGER,
+    recurrence TEXT,
+    flexibility TEXT,
+    series_start TEXT,
+    series_end TEXT
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    last_id INTEGER NOT NULL,
+    max_span_seconds INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calendar_versions (
+    calendar_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release, created on databases that predate them
+_ADDED_COLUMNS = {
+    "calendar_id": "TEXT NOT NULL DEFAULT 'default'",
+    "occurrence": "INTEGER",
+    "recurrence": "TEXT",
+    "flexibility": "TEXT",
+    "series_start": "TEXT",
+    "series_end": "TEXT"
+}
+
+_INDEXES = """
+DROP INDEX IF EXISTS idx_events_start_end;
+DROP INDEX IF EXISTS idx_events_series;
+CREATE INDEX IF NOT EXISTS idx_events_calendar_start_end ON events (calendar_id, start_at, end_at);
+CREATE INDEX IF NOT EXISTS idx_events_calendar_series ON events (calendar_id, series_start, series_end);
+CREATE INDEX IF NOT EXISTS idx_events_parent ON events (parent_id);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events (type);
+CREATE INDEX IF NOT EXISTS idx_events_span ON events ((julianday(end_at) - julianday(start_at)));
+"""
+
+# Longest event span in the file in whole seconds, rounded up; read through idx_events_span
+_LONGEST_SPAN = (
+    "SELECT COALESCE(CAST(ROUND(MAX(julianday(end_at) - julianday(start_at)) * 86400) AS INTEGER) + 1, 0) "
+    "FROM events"
+)
+
+# Per-thread connections for each database file, shared by its calendars
+_connections = {}
+
+_COLUMNS = (
+    "id, title, priority, type, start_at, end_at, parent_id, occurrence, recurrence, flexibility"
+)
+
+
+def _thread_connection(path):
+    local = _connections.setdefault(path, threading.local())
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+    return conn
+
+
+def _to_text(value):
+    return value.isoformat() if value is not None else None
+
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _span_seconds(start, end):
+    return int((end - start).total_seconds()) + 1
+
+
+def _row_to_event(row):
+    return Event(
+        id=row[0],
+        title=row[1],
+        priority=row[2],
+        type=row[3],
+        start=_to_datetime(row[4]),
+        end=_to_datetime(row[5]),
+        parent_id=row[6],
+        occurrence=row[7],
+        recurrence=Recurrence.from_dict(json.loads(row[8])) if row[8] else None,
+        flexibility=Flexibility.from_dict(json.loads(row[9])) if row[9] else None
+    )
+
+
+class SQLiteStore(EventStore):
+    """Persistent store in a SQLite database file.
+
+    Calendars share one database file, each store seeing only the rows of
+    its ``calendar_id``; ids come from one sequence for the whole file.
+    Each thread gets its own connection and the database runs in WAL mode,
+    so readers never block the writer. Transactions begin IMMEDIATE, which
+    makes check-then-write sequences atomic across worker processes too. Range queries are bounded below by the
+    longest event stored (kept in store_meta so every worker sees it), which
+    keeps them on the (start_at, end_at) index; it is recomputed when the
+    longest event is deleted or shortened, so one long event does not widen
+    every later query.
+    """
+
+    def __init__(self, path, calendar_id=DEFAULT_CALENDAR):
+        if path == ":memory:":
+            raise ValueError("SQLiteStore needs a database file; use MemoryStore instead")
+        super().__init__()
+        self.path = path
+        self.calendar_id = calendar_id
+        self._written = False
+        self._local = _connections.setdefault(path, threading.local())
+        conn = self._connection()
+        with conn:
+            conn.executescript(_TABLES)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE events ADD COLUMN {column} {column_type}")
+            conn.executescript(_INDEXES)
+            if conn.execute("SELECT COUNT(*) FROM store_meta").fetchone()[0] == 0:
+                conn.execute(
+                    "INSERT INTO store_meta (last_id, max_span_seconds) "
+                    f"SELECT COALESCE(MAX(id), 0), ({_LONGEST_SPAN}) FROM events"
+                )
+
+    def _connection(self):
+        return _thread_connection(self.path)
+
+    @staticmethod
+    def exists(path, calendar_id=DEFAULT_CALENDAR):
+        """Return True if the database at path holds events of this calendar."""
+        if not os.path.exists(path):
+            return False
+        try:
+            return _thread_connection(path).execute(
+                "SELECT 1 FROM events WHERE calendar_id = ? LIMIT 1", (calendar_id,)
+            ).fetchone() is not None
+        except sqlite3.OperationalError:
+            # No events table yet
+            return False
+
+    def _max_span(self):
+        row = self._connection().execute("SELECT max_span_seconds FROM store_meta").fetchone()
+        return timedelta(seconds=row[0])
+
+    def _query(self, sql, params=()):
+        rows = self._connection().execute(sql, params).fetchall()
+        return [_row_to_event(row) for row in rows]
+
+    def __len__(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM events WHERE calendar_id = ?", (self.calendar_id,)
+        ).fetchone()[0]
+
+    def _begin(self):
+        # Calendars on one file share the thread's connection, so only the
+        # outermost of their transactions begins and commits. It takes the
+        # database write lock up front so other workers cannot interleave
+        # their own check-then-write sequences.
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            self._connection().execute("BEGIN IMMEDIATE")
+        self._local.depth = depth + 1
+
+    def _commit(self):
+        if self._written:
+            # Tells every worker's response caches that this calendar changed
+            self._connection().execute(
+                "INSERT INTO calendar_versions (calendar_id, version) VALUES (?, 1) "
+                "ON CONFLICT (calendar_id) DO UPDATE SET version = version + 1",
+                (self.calendar_id,)
+            )
+            self._written = False
+        if self._local.depth == 1:
+            self._connection().commit()
+        self._local.depth -= 1
+
+    def _rollback(self):
+        self._written = False
+        self._local.depth -= 1
+        self._connection().rollback()
+        return True
+
+    def shared_version(self):
+        row = self._connection().execute(
+            "SELECT version FROM calendar_versions WHERE calendar_id = ?", (self.calendar_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _next_id(self):
+        conn = self._connection()
+        conn.execute("UPDATE store_meta SET last_id = last_id + 1")
+        return conn.execute("SELECT last_id FROM store_meta").fetchone()[0]
+
+    def _put(self, event):
+        rule = event.recurrence
+        flexibility = event.flexibility
+        series_start, series_end = rule.span() if rule is not None else (None, None)
+        conn = self._connection()
+        self._written = True
+        existing = conn.execute(
+            "SELECT start_at, end_at FROM events WHERE calendar_id = ? AND id = ?",
+            (self.calendar_id, event.id)
+        ).fetchone()
+        conn.execute(
+            f"INSERT OR REPLACE INTO events ({_COLUMNS}, series_start, series_end, calendar_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (event.id, event.title, event.priority, event.type,
+             _to_text(event.start), _to_text(event.end), event.parent_id, event.occurrence,
+             json.dumps(rule.to_dict()) if rule is not None else None,
+             json.dumps(flexibility.to_dict()) if flexibility is not None else None,
+             _to_text(series_start), _to_text(series_end), self.calendar_id)
+        )
+        if event.is_timed:
+            conn.execute(
+                "UPDATE store_meta SET max_span_seconds = MAX(max_span_seconds, ?)",
+                (_span_seconds(event.start, event.end),)
+            )
+        if existing is not None and existing[0] is not None:
+            self._release_span(_to_datetime(existing[0]), _to_datetime(existing[1]))
+        return existing is not None
+
+    def _remove(self, event_id):
+        event = self._get(event_id)
+        if event is None:
+            return None
+        self._written = True
+        self._connection().execute(
+            "DELETE FROM events WHERE calendar_id = ? AND id = ?", (self.calendar_id, event_id)
+        )
+        if event.is_timed:
+            self._release_span(event.start, event.end)
+        return event
+
+    def _release_span(self, start, end):
+        """Recompute the longest span if the event that spanned [start, end) may have set it."""
+        self._connection().execute(
+            f"UPDATE store_meta SET max_span_seconds = ({_LONGEST_SPAN}) WHERE max_span_seconds <= ?",
+            (_span_seconds(start, end),)
+        )
+
+    def _get(self, event_id):
+        events = self._query(
+            f"SELECT {_COLUMNS} FROM events WHERE calendar_id = ? AND id = ?",
+            (self.calendar_id, event_id)
+        )
+        return events[0] if events else None
+
+    def _all(self, after=None, limit=None):
+        return self._query(
+            f"SELECT {_COLUMNS} FROM events WHERE calendar_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (self.calendar_id, after if after is not None else -1, limit if limit is not None else -1)
+        )
+
+    def _instances(self, parent_id):
+        return self._query(
+            f"SELECT {_COLUMNS} FROM events WHERE calendar_id = ? AND parent_id = ? ORDER BY start_at",
+            (self.calendar_id, parent_id)
+        )
+
+    def _page(self, start, end, after=None, limit=None):
+        sql = (
+            f"SELECT {_COLUMNS} FROM events "
+            "WHERE calendar_id = ? AND start_at >= ? AND start_at < ? AND end_at > ? AND end_at > start_at "
+        )
+        span = self._max_span()
+        lower = start - span if start - datetime.min > span else datetime.min
+        params = [self.calendar_id, _to_text(lower), _to_text(end), _to_text(start)]
+        if after is not None:
+            sql += "AND (start_at, id) > (?, ?) "
+            params += [_to_text(after[0]), after[1]]
+        sql += "ORDER BY start_at, id LIMIT ?"
+        params.append(limit if limit is not None else -1)
+        return self._query(sql, params)
+
+    def _series(self, start, end):
+        return self._query(
+            f"SELECT {_COLUMNS} FROM events "
+            "WHERE calendar_id = ? AND series_start < ? AND series_end > ? AND recurrence IS NOT NULL",
+            (self.calendar_id, _to_text(end), _to_text(start))
+        )
+
+    def _unplaced(self):
+        return self._query(
+            f"SELECT {_COLUMNS} FROM events "
+            "WHERE calendar_id = ? AND start_at IS NULL AND flexibility IS NOT NULL ORDER BY id",
+            (self.calendar_id,)
+        )
+
+
+def create_store(database=None, calendar_id=DEFAULT_CALENDAR, data_dir=None):
+    """Build a calendar's store.
+
+    SQLite when a database path is given; otherwise memory, made durable in
+    a directory per calendar under ``data_dir`` when that is given.
+    """
+    if database:
+        return SQLiteStore(database, calendar_id)
+    if data_dir:
+        if calendar_id in (".", ".."):
+            raise ValueError("Invalid calendar id")
+        return DurableStore(os.path.join(data_dir, calendar_id))
+    return MemoryStore()
+
+
+def store_exists(database=None, calendar_id=DEFAULT_CALENDAR, data_dir=None):
+    """Return True if a calendar's store has anything stored to open; memory stores never do."""
+    if database:
+        return SQLiteStore.exists(database, calendar_id)
+    if data_dir and calendar_id not in (".", ".."):
+        return os.path.isdir(os.path.join(data_dir, calendar_id))
+    return False
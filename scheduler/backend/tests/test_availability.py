@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+from models import Event
+
+pytest.importorskip("numpy")
+
+NINE = datetime(2027, 1, 4, 9)
+
+
+def fixed(store, start, minutes):
+    event = Event(
+        id=store.next_id(), title="Busy", priority="medium", type="fixed",
+        start=start, end=start + timedelta(minutes=minutes)
+    )
+    store.add(event)
+    return event
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    registry = CalendarRegistry(availability="bitmap")
+    monkeypatch.setattr(app_module, "calendars", registry)
+    calendar = registry.get("default")
+
+    # Placement has to read the bitmap, not the interval index
+    def intervals(start, end):
+        raise AssertionError("placement read the interval index")
+    monkeypatch.setattr(calendar.store, "intervals", intervals)
+    return calendar
+
+
+def test_busy_runs(calendar):
+    fixed(calendar.store, NINE, 60)
+    fixed(calendar.store, NINE + timedelta(minutes=30), 60)
+    fixed(calendar.store, NINE + timedelta(hours=3), 15)
+    day_start = NINE.replace(hour=0)
+
+    assert calendar.availability.busy(day_start, day_start + timedelta(days=1)) == [
+        (NINE, NINE + timedelta(minutes=90)),
+        (NINE + timedelta(hours=3), NINE + timedelta(hours=3, minutes=15))
+    ]
+    assert calendar.availability.busy(NINE + timedelta(hours=1), NINE + timedelta(hours=2)) == [
+        (NINE + timedelta(hours=1), NINE + timedelta(minutes=90))
+    ]
+    assert calendar.availability.busy(NINE, NINE) == []
+
+
+def test_flexible_placement_reads_the_bitmap(calendar):
+    fixed(calendar.store, NINE, 60)
+    client = app_module.app.test_client()
+
+    response = client.post("/events", json={
+        "title": "Flexible", "priority": "high", "type": "flexible_without_preferred_time",
+        "duration": 60, "earliest_start": NINE.isoformat(),
+        "deadline": (NINE + timedelta(hours=3)).isoformat()
+    })
+    assert response.status_code == 201
+    assert response.get_json()["start"] == "2027-01-04T10:00:00"
+
+
+def test_recurring_placement_reads_the_bitmap(calendar):
+    fixed(calendar.store, NINE + timedelta(days=1), 60)
+    client = app_module.app.test_client()
+
+    response = client.post("/events", json={
+        "title": "Daily", "priority": "medium", "type": "recurring_without_preferred_time",
+        "duration": 60, "frequency": 1, "start_date": NINE.isoformat(),
+        "end_date": (NINE + timedelta(days=2)).isoformat()
+    })
+    assert response.status_code == 201
+    day = NINE + timedelta(days=1)
+    starts = [
+        event["start"] for event in client.get(
+            f"/events?start={day.replace(hour=0).isoformat()}&end={day.replace(hour=23).isoformat()}"
+        ).get_json()
+    ]
+    assert sorted(starts) == ["2027-01-05T00:00:00", "2027-01-05T09:00:00"]
+
+
+def test_overnight_preferred_slots(calendar):
+    fixed(calendar.store, NINE.replace(hour=23), 60)
+    response = app_module.app.test_client().get(
+        "/slots?start=2027-01-04T00:00:00&end=2027-01-05T23:00:00&duration=60&interval=60&preferred_time=22:00-02:00"
+    )
+    assert response.status_code == 200
+    assert [slot["start"] for slot in response.get_json()["slots"]] == [
+        "2027-01-04T00:00:00", "2027-01-04T01:00:00", "2027-01-04T22:00:00",
+        "2027-01-05T00:00:00", "2027-01-05T01:00:00", "2027-01-05T22:00:00"
+    ]
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+
+EVENT = {
+    "title": "Event", "priority": "medium", "type": "fixed",
+    "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:00:00"
+}
+
+
+@pytest.fixture(params=["memory", "durable", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "durable":
+        return {"data_dir": str(tmp_path / "calendars")}
+    if request.param == "sqlite":
+        return {"database": str(tmp_path / "events.db")}
+    return {}
+
+
+def use(monkeypatch, registry):
+    monkeypatch.setattr(app_module, "calendars", registry)
+    return app_module.app.test_client()
+
+
+def test_reads_do_not_create_calendars(monkeypatch, tmp_path, backend):
+    registry = CalendarRegistry(**backend)
+    client = use(monkeypatch, registry)
+
+    for number in range(20):
+        headers = {"X-Calendar-Id": f"probe-{number}"}
+        assert client.get("/events", headers=headers).get_json() == []
+        assert client.get("/statistics", headers=headers).status_code == 200
+        assert client.get("/events/changes?since=0", headers=headers).status_code == 200
+    response = client.post("/freebusy", json={
+        "calendars": [f"other-{number}" for number in range(20)],
+        "start": "2027-01-04T00:00:00", "end": "2027-01-05T00:00:00"
+    })
+    assert response.status_code == 200
+
+    assert len(registry) == 0
+    if "data_dir" in backend:
+        assert not os.path.exists(backend["data_dir"])
+
+
+def test_writes_create_and_reads_find_stored_calendars(monkeypatch, backend):
+    registry = CalendarRegistry(**backend)
+    client = use(monkeypatch, registry)
+    headers = {"X-Calendar-Id": "team"}
+    assert client.post("/events", json=EVENT, headers=headers).status_code == 201
+    assert len(client.get("/events", headers=headers).get_json()) == 1
+    if registry.data_dir:
+        registry.get("team").store.close()
+
+    # Another process, or this one after a restart, opens it on a read
+    registry = CalendarRegistry(**backend)
+    client = use(monkeypatch, registry)
+    expected = 0 if not backend else 1
+    response = client.get("/events", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == expected
+    assert len(registry) == expected
+    if registry.data_dir:
+        registry.get("team").store.close()
+
+
+def test_booking_creates_the_calendars_it_writes(monkeypatch):
+    registry = CalendarRegistry()
+    client = use(monkeypatch, registry)
+    response = client.post("/freebusy", json={
+        "calendars": ["a", "b"], "start": "2027-01-04T09:00:00", "end": "2027-01-04T17:00:00",
+        "duration": 30, "book": {"title": "Meeting", "priority": "high"}
+    })
+    assert response.status_code == 201
+    assert sorted(response.get_json()["booked"]) == ["a", "b"]
+    assert len(registry) == 2
+
+
+def test_open_calendars_are_bounded(monkeypatch):
+    registry = CalendarRegistry(max_calendars=2)
+    client = use(monkeypatch, registry)
+    for calendar_id in ("a", "b"):
+        assert client.post("/events", json=EVENT, headers={"X-Calendar-Id": calendar_id}).status_code == 201
+    assert client.post("/events", json=EVENT, headers={"X-Calendar-Id": "c"}).status_code == 503
+    # Open calendars keep working
+    assert client.post("/events", json=dict(EVENT, start="2027-01-04T11:00:00", end="2027-01-04T12:00:00"),
+                       headers={"X-Calendar-Id": "a"}).status_code == 201
+    assert len(registry) == 2
@@ -0,0 +1,96 @@
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "calendars", CalendarRegistry())
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("event_type", ["meeting", 5, None])
+def test_unknown_type_is_rejected(client, event_type):
+    response = client.post("/events", json={
+        "title": "Event", "priority": "medium", "type": event_type,
+        "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:00:00"
+    })
+    assert response.status_code == 400
+    assert "Unknown event type" in response.get_json()["error"]
+    assert client.get("/events").get_json() == []
+
+
+def test_unknown_type_in_batch_is_rejected(client):
+    response = client.post("/events/batch", json={"events": [
+        {"title": "Event", "priority": "medium", "type": ["fixed"]},
+        {"title": "Event", "priority": "medium", "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:00:00"}
+    ]})
+    results = response.get_json()["results"]
+    assert results[0]["status"] == 400
+    assert "Unknown event type" in results[0]["error"]
+    assert results[1]["status"] == 201
+
+
+@pytest.mark.parametrize("query", [
+    "start=0001-01-01T00:00:00&end=9999-12-31T23:59:59",
+    "start=0001-01-01T00:00:00&limit=1",
+    "start=0001-01-01T00:00:00&stream=ndjson",
+    "start=9999-12-31T23:00:00&end=9999-12-31T23:59:59"
+])
+def test_ranges_at_the_datetime_limits(monkeypatch, tmp_path, query):
+    monkeypatch.setattr(app_module, "calendars", CalendarRegistry(str(tmp_path / "events.db")))
+    client = app_module.app.test_client()
+    client.post("/events", json={
+        "title": "Event", "priority": "medium", "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:00:00"
+    })
+    client.post("/events", json={
+        "title": "Daily", "priority": "low", "type": "recurring_without_preferred_time",
+        "duration": 30, "frequency": 1, "start_date": "2027-01-05T09:00:00", "end_date": "2027-01-07T09:00:00"
+    })
+    response = client.get(f"/events?{query}")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert ("Event" in body) == (not query.startswith("start=9999"))
+
+
+@pytest.mark.parametrize("event_type,fields", [
+    ("flexible_with_preferred_time", {"earliest_start": "2027-01-04T08:00:00", "deadline": "2027-01-04T18:00:00"}),
+    ("recurring_with_preferred_time", {"frequency": 1, "start_date": "2027-01-04T09:00:00"})
+])
+@pytest.mark.parametrize("preferred_time", ["25:00-26:00", "nonsense", 5])
+def test_invalid_preferred_time_is_rejected(client, event_type, fields, preferred_time):
+    item = dict(fields, title="Event", priority="low", type=event_type, duration=30, preferred_time=preferred_time)
+    response = client.post("/events", json=item)
+    assert response.status_code == 400
+    assert "Invalid preferred time" in response.get_json()["error"]
+
+    result = client.post("/events/batch", json={"events": [item]}).get_json()["results"][0]
+    assert result["status"] == 400
+    assert "Invalid preferred time" in result["error"]
+    assert client.get("/events").get_json() == []
+
+
+def test_overnight_preferred_time(client):
+    client.post("/events", json={
+        "title": "Late", "priority": "high", "start": "2027-01-04T22:00:00", "end": "2027-01-05T01:00:00"
+    })
+    response = client.post("/events", json={
+        "title": "Flexible", "priority": "low", "type": "flexible_with_preferred_time", "duration": 60,
+        "earliest_start": "2027-01-04T08:00:00", "deadline": "2027-01-05T08:00:00", "preferred_time": "22:00-02:00"
+    })
+    assert response.status_code == 201
+    assert response.get_json()["start"] == "2027-01-05T01:00:00"
+
+    response = client.post("/events", json={
+        "title": "Nightly", "priority": "low", "type": "recurring_with_preferred_time", "duration": 30,
+        "frequency": 1, "start_date": "2027-01-04T12:00:00", "end_date": "2027-01-05T12:00:00",
+        "preferred_time": "22:00-02:00"
+    })
+    assert response.status_code == 201
+    starts = sorted(
+        event["start"] for event in client.get("/events?start=2027-01-04T00:00:00&end=2027-01-06T00:00:00").get_json()
+        if event["title"] == "Nightly"
+    )
+    # Each occurrence stays on its day, in the part of the window that day has
+    assert starts == ["2027-01-04T00:00:00", "2027-01-05T22:00:00"]
@@ -0,0 +1,171 @@
+import io
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+import ical
+from calendars import CalendarRegistry
+
+
+def read(text):
+    return list(ical.read_vevents(io.BytesIO(text.replace("\n", "\r\n").encode())))
+
+
+def calendar(*events):
+    return "BEGIN:VCALENDAR\nVERSION:2.0\n" + "".join(
+        "BEGIN:VEVENT\n" + event.strip() + "\nEND:VEVENT\n" for event in events
+    ) + "END:VCALENDAR\n"
+
+
+def test_read_vevents_unfolds_and_skips_nested_components():
+    events = read(calendar("""
+UID:1
+SUMMARY:A long title that was
+  folded
+DTSTART;TZID="Europe/Berlin";X-NOTE="a:b":20270301T100000
+BEGIN:VALARM
+SUMMARY:Reminder
+END:VALARM
+"""))
+    assert len(events) == 1
+    assert events[0]["SUMMARY"] == [({}, "A long title that was folded")]
+    assert events[0]["DTSTART"] == [({"TZID": '"Europe/Berlin"', "X-NOTE": '"a:b"'}, "20270301T100000")]
+
+
+def test_read_vevents_reads_across_blocks(monkeypatch):
+    monkeypatch.setattr(ical, "READ_SIZE", 7)
+    title = " ".join(["Café été"] * 10)
+    events = read(calendar(f"UID:1\nSUMMARY:{title}", "UID:2"))
+    assert [event["UID"][0][1] for event in events] == ["1", "2"]
+    assert events[0]["SUMMARY"][0][1] == title
+
+
+def test_vevent_item_with_duration_and_time_zone():
+    item, info = ical.vevent_item(read(calendar("""
+UID:1
+DTSTART;TZID=Europe/Berlin:20270301T100000
+DURATION:PT45M
+"""))[0])
+    assert item["type"] == "fixed"
+    assert (item["start"], item["end"]) == (datetime(2027, 3, 1, 9), datetime(2027, 3, 1, 9, 45))
+    assert info == ical.VEventInfo("1", None, [])
+
+
+def test_vevent_item_flexible_keeps_its_window_and_slot():
+    item, _ = ical.vevent_item(read(calendar("""
+UID:1
+DTSTART:20271019T100000Z
+DURATION:PT1H
+X-SCHEDULER-TYPE:flexible_without_preferred_time
+X-SCHEDULER-EARLIEST-START:20271019T090000Z
+X-SCHEDULER-DEADLINE:20271020T170000Z
+X-SCHEDULER-DURATION:60
+"""))[0])
+    assert item["earliest_start"] == datetime(2027, 10, 19, 9)
+    assert item["deadline"] == datetime(2027, 10, 20, 17)
+    assert item["start"] == datetime(2027, 10, 19, 10)
+
+
+def test_vevent_item_flexible_without_window_stays_put():
+    item, _ = ical.vevent_item(read(calendar("""
+UID:1
+DTSTART:20271019T100000Z
+DURATION:PT1H
+X-SCHEDULER-TYPE:flexible_without_preferred_time
+"""))[0])
+    assert (item["earliest_start"], item["deadline"]) == (datetime(2027, 10, 19, 10), datetime(2027, 10, 19, 11))
+
+
+def test_vevent_item_series():
+    item, info = ical.vevent_item(read(calendar("""
+UID:s
+DTSTART:20270301T100000Z
+DTEND:20270301T103000Z
+RRULE:FREQ=WEEKLY;BYDAY=MO;COUNT=3
+EXDATE:20270308T100000Z,20270315T100000Z
+"""))[0])
+    assert (item["frequency"], item["duration"]) == (7, 30)
+    assert item["end_date"] == datetime(2027, 3, 15, 10)
+    assert info.exdates == [datetime(2027, 3, 8, 10), datetime(2027, 3, 15, 10)]
+
+
+@pytest.mark.parametrize("properties, error", [
+    ("DTSTART;VALUE=DATE:20270301\nDTEND;VALUE=DATE:20270302", "All-day"),
+    ("DTSTART:20270301T100000Z\nDTEND:20270301T110000Z\nRRULE:FREQ=MONTHLY", "Unsupported RRULE"),
+    ("DTSTART:20270301T100000Z\nDTEND:20270301T110000Z\nRRULE:FREQ=WEEKLY;BYDAY=MO,WE", "Unsupported RRULE"),
+    ("DTSTART:20270301T100000Z", "DTEND or DURATION"),
+    ("DTSTART:20270301T100000Z\nDTEND:20270301T090000Z", "ends before"),
+    ("DTSTART;TZID=Nowhere/Else:20270301T100000\nDURATION:PT1H", "Unknown time zone"),
+    ("DTSTART:2027-03-01\nDURATION:PT1H", "Invalid date-time"),
+])
+def test_vevent_item_rejects(properties, error):
+    with pytest.raises(ValueError, match=error):
+        ical.vevent_item(read(calendar("UID:1\n" + properties))[0])
+
+
+def test_text_and_folding_round_trip():
+    title = 'Stand-up, daily; "team"\nnotes \\ ' + "é" * 80
+    line = ical.fold("SUMMARY:" + ical.escape_text(title))
+    assert all(len(piece.encode()) <= 75 for piece in line.split("\r\n"))
+    events = read(calendar(line.replace("\r\n", "\n")))
+    assert ical.unescape_text(events[0]["SUMMARY"][0][1]) == title
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "calendars", CalendarRegistry())
+    return app_module.app.test_client()
+
+
+def test_import_reports_bad_events_and_keeps_going(client):
+    response = client.post("/import/ics", data=calendar(
+        "UID:bad\nDTSTART:20270301T10\nDURATION:PT1H",
+        "UID:good\nDTSTART:20270301T100000Z\nDURATION:PT1H\nSUMMARY:Good"
+    ))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["imported"], body["failed"]) == (1, 1)
+    assert body["errors"][0]["uid"] == "bad"
+
+
+def test_import_keeps_flexible_events_at_their_free_slot(client):
+    client.post("/import/ics", data=calendar("""
+UID:f
+SUMMARY:F
+DTSTART:20271019T130000Z
+DTEND:20271019T140000Z
+X-SCHEDULER-TYPE:flexible_without_preferred_time
+X-SCHEDULER-EARLIEST-START:20271019T090000Z
+X-SCHEDULER-DEADLINE:20271020T170000Z
+X-SCHEDULER-DURATION:60
+"""))
+    events = client.get("/events").get_json()
+    assert [(event["title"], event["start"]) for event in events] == [("F", "2027-10-19T13:00:00")]
+
+
+def test_export_imports_back(client):
+    series = {
+        "title": "Gym", "priority": "low", "type": "recurring_with_preferred_time", "duration": 60,
+        "frequency": 2, "start_date": "2027-01-04T00:00:00", "end_date": "2027-01-12T00:00:00",
+        "preferred_time": "18:00 - 21:00"
+    }
+    client.post("/events", json={
+        "title": "Blocker", "priority": "high", "type": "fixed",
+        "start": "2027-01-06T18:00:00", "end": "2027-01-06T19:30:00"
+    })
+    client.post("/events", json=series)
+    client.post("/events", json={
+        "title": "Report", "priority": "medium", "type": "flexible_without_preferred_time", "duration": 90,
+        "earliest_start": "2027-01-05T08:00:00", "deadline": "2027-01-08T00:00:00"
+    })
+    exported = client.get("/events.ics").data
+    assert client.post("/import/ics", data=exported, headers={"X-Calendar-Id": "copy"}).get_json()["failed"] == 0
+
+    def listing(calendar_id):
+        events = client.get(
+            "/events?start=2027-01-01T00:00:00&end=2027-02-01T00:00:00", headers={"X-Calendar-Id": calendar_id}
+        ).get_json()
+        return sorted((event["title"], event["start"], event["end"]) for event in events)
+
+    assert listing("copy") == listing("default")
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+from interval_index import IntervalIndex
+
+
+def test_queries_near_the_datetime_limits():
+    index = IntervalIndex()
+    index.add(1, datetime.min, datetime.min + timedelta(days=2), "first")
+    index.add(2, datetime(2027, 1, 4, 9), datetime(2027, 1, 4, 10), "second")
+    index.add(3, datetime.max - timedelta(hours=1), datetime.max, "last")
+
+    assert index.overlapping(datetime.min, datetime.min + timedelta(hours=1)) == ["first"]
+    assert index.overlapping(datetime.min + timedelta(days=1), datetime.max) == ["first", "second", "last"]
+    assert index.overlaps(datetime.max - timedelta(minutes=1), datetime.max)
+    assert index.page(datetime.min, datetime.max, limit=2) == ["first", "second"]
+
+
+def test_removing_the_longest_interval_narrows_the_scan():
+    index = IntervalIndex()
+    index.add(1, datetime(2027, 1, 1), datetime(2027, 3, 1), "long")
+    index.add(2, datetime(2027, 1, 4, 9), datetime(2027, 1, 4, 10), "short")
+    index.remove(1)
+    assert index.overlapping(datetime(2027, 1, 4, 9, 30), datetime(2027, 1, 4, 11)) == ["short"]
+    assert not index.overlaps(datetime(2027, 2, 1), datetime(2027, 2, 2))
@@ -0,0 +1,183 @@
+import os
+import pickle
+from datetime import datetime, timedelta
+
+import pytest
+
+import journal
+from journal import Journal, encode_event
+from models import Event, Flexibility, Recurrence
+from storage import DurableStore
+
+NINE = datetime(2027, 1, 4, 9)
+
+
+def fixed(event_id, start=NINE):
+    return Event(
+        id=event_id, title=f"Event {event_id}", priority="medium", type="fixed",
+        start=start, end=start + timedelta(hours=1)
+    )
+
+
+def open_journal(directory):
+    log = Journal(str(directory))
+    return log, log.load()
+
+
+def log_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".bin"))
+
+
+def test_replay_applies_puts_deletes_and_sequence(tmp_path):
+    log, loaded = open_journal(tmp_path)
+    assert loaded == ([], 0, 0)
+    log.append([("put", encode_event(fixed(1))), ("put", encode_event(fixed(2)))])
+    log.append([("del", 1), ("seq", 7)])
+    log.close()
+
+    log, (records, last_id, replayed) = open_journal(tmp_path)
+    assert records == [encode_event(fixed(2))]
+    assert last_id == 7
+    assert replayed == 4
+    log.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    log, _ = open_journal(tmp_path)
+    log.append([("put", encode_event(fixed(1)))])
+    log.append([("put", encode_event(fixed(2)))])
+    log.close()
+    path = tmp_path / log_files(tmp_path)[0]
+    intact = path.stat().st_size
+    # A crash in the middle of writing a frame
+    with open(path, "ab") as f:
+        f.write(journal._frame(journal._dumps([("put", encode_event(fixed(3)))]))[:-5])
+
+    log, (records, last_id, _) = open_journal(tmp_path)
+    assert [record[0] for record in records] == [1, 2]
+    assert last_id == 2
+    assert path.stat().st_size == intact
+
+    # Frames written after the truncation are read back
+    log.append([("del", 2)])
+    log.close()
+    log, (records, _, _) = open_journal(tmp_path)
+    assert [record[0] for record in records] == [1]
+    log.close()
+
+
+def test_corrupt_frame_drops_the_rest_of_the_log(tmp_path):
+    log, _ = open_journal(tmp_path)
+    log.append([("put", encode_event(fixed(1)))])
+    log.append([("put", encode_event(fixed(2)))])
+    log.close()
+    path = tmp_path / log_files(tmp_path)[0]
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    log, (records, _, _) = open_journal(tmp_path)
+    assert [record[0] for record in records] == [1]
+    log.close()
+
+
+def test_unexpected_objects_are_refused(tmp_path):
+    log, _ = open_journal(tmp_path)
+    log.append([("seq", os.getpid)])
+    log.close()
+    with pytest.raises(pickle.UnpicklingError):
+        open_journal(tmp_path)
+
+
+def test_snapshot_replaces_older_generations(tmp_path):
+    log, _ = open_journal(tmp_path)
+    log.append([("put", encode_event(fixed(1))), ("put", encode_event(fixed(2)))])
+    generation = log.rotate()
+    log.append([("del", 1)])
+    log.write_snapshot(generation, 2, [encode_event(fixed(1)), encode_event(fixed(2))])
+    log.close()
+    assert log_files(tmp_path) == ["log-00000001.bin", "snapshot-00000001.bin"]
+
+    # Only the log after the snapshot is replayed
+    log, (records, last_id, replayed) = open_journal(tmp_path)
+    assert [record[0] for record in records] == [2]
+    assert last_id == 2
+    assert replayed == 1
+    log.close()
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="the directory is only locked with fcntl")
+def test_directory_is_locked(tmp_path):
+    log = Journal(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        Journal(str(tmp_path))
+    log.close()
+    Journal(str(tmp_path)).close()
+
+
+def sample_events(store):
+    events = [
+        fixed(store.next_id()),
+        Event(
+            id=store.next_id(), title="Flexible", priority="high", type="flexible_with_preferred_time",
+            start=NINE + timedelta(hours=2), end=NINE + timedelta(hours=3),
+            flexibility=Flexibility(NINE, NINE + timedelta(days=1), 60, "09:00-17:00")
+        ),
+        Event(
+            id=store.next_id(), title="Daily", priority="low", type="recurring_without_preferred_time",
+            recurrence=Recurrence(NINE, 1, 30, 5, skipped={1}, displaced={2})
+        )
+    ]
+    with store.transaction():
+        for event in events:
+            store.add(event)
+    return events
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_durable_store_restarts_with_its_events(tmp_path, compact):
+    store = DurableStore(str(tmp_path))
+    events = sample_events(store)
+    store.remove(events[0].id)
+    if compact:
+        store.compact()
+    expanded = store.overlapping(NINE, NINE + timedelta(days=5))
+    store.close()
+
+    store = DurableStore(str(tmp_path))
+    assert sorted(store.all(), key=lambda event: event.id) == events[1:]
+    # Ids handed out before the restart are not reused
+    assert store.next_id() == events[-1].id + 1
+    # Occurrences skipped or displaced before the restart stay so
+    assert store.overlapping(NINE, NINE + timedelta(days=5)) == expanded
+    store.close()
+    if compact:
+        assert "snapshot-00000001.bin" in log_files(tmp_path)
+
+
+def test_durable_store_compacts_after_snapshot_every(tmp_path):
+    store = DurableStore(str(tmp_path), snapshot_every=3)
+    sample_events(store)
+    # The background compaction holds this lock until its snapshot is written
+    with store._compacting:
+        pass
+    store.close()
+    assert "snapshot-00000001.bin" in log_files(tmp_path)
+
+    store = DurableStore(str(tmp_path), snapshot_every=3)
+    assert store._logged == 0
+    assert len(store.all()) == 3
+    store.close()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc to count descriptors")
+def test_idle_journal_holds_only_its_lock(tmp_path):
+    before = len(os.listdir("/proc/self/fd"))
+    store = DurableStore(str(tmp_path))
+    # Opening an empty store writes no log
+    assert log_files(tmp_path) == []
+    sample_events(store)
+    assert log_files(tmp_path) == ["log-00000000.bin"]
+    assert len(os.listdir("/proc/self/fd")) == before + 1
+    store.close()
+    assert len(os.listdir("/proc/self/fd")) == before
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from locks import RWLock
+
+
+def run_in_thread(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_reads_and_writes_are_reentrant():
+    lock = RWLock()
+    with lock.write():
+        with lock.write():
+            assert lock.writing
+        # The writer may read, at any depth
+        with lock.read():
+            with lock.read():
+                assert lock.writing
+        assert lock.writing
+    assert not lock.writing
+
+    with lock.read():
+        with lock.read():
+            pass
+    # Fully released: another thread can write
+    acquired = threading.Event()
+
+    def writer():
+        with lock.write():
+            acquired.set()
+
+    run_in_thread(writer).join(1)
+    assert acquired.is_set()
+
+
+def test_reader_cannot_upgrade():
+    lock = RWLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            with lock.write():
+                pass
+    # The failed upgrade left nothing held
+    with lock.write():
+        assert lock.writing
+
+
+def test_readers_share_the_lock():
+    lock = RWLock()
+    inside = threading.Barrier(2, timeout=1)
+
+    def reader():
+        with lock.read():
+            inside.wait()
+
+    thread = run_in_thread(reader)
+    with lock.read():
+        inside.wait()
+    thread.join(1)
+    assert not thread.is_alive()
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = RWLock()
+    order = []
+    first_read = lock.read()
+    first_read.__enter__()
+
+    def writer():
+        with lock.write():
+            order.append("write")
+
+    def reader():
+        with lock.read():
+            order.append("read")
+
+    writer_thread = run_in_thread(writer)
+    while not lock._waiting_writers:
+        time.sleep(0.001)
+    reader_thread = run_in_thread(reader)
+    time.sleep(0.05)
+    assert order == []
+
+    first_read.__exit__(None, None, None)
+    writer_thread.join(1)
+    reader_thread.join(1)
+    assert order == ["write", "read"]
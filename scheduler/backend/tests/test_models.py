@@ -0,0 +1,11 @@
+from datetime import datetime, timedelta
+
+from models import Recurrence
+
+
+def test_occurrences_of_ranges_at_the_datetime_limits():
+    rule = Recurrence(datetime(2027, 1, 4, 9), 1, 30, 3, skipped={1})
+    assert list(rule.indexes(datetime.min, datetime.max)) == [0, 1, 2]
+    assert [index for index, _, _ in rule.occurrences(datetime.min, datetime.max)] == [0, 2]
+    assert list(rule.indexes(datetime.min, datetime.min + timedelta(days=1))) == []
+    assert list(rule.indexes(datetime.max - timedelta(days=1), datetime.max)) == []
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+from models import Event, Flexibility
+from storage import SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def client(request, monkeypatch, tmp_path):
+    database = str(tmp_path / "events.db") if request.param == "sqlite" else None
+    registry = CalendarRegistry(database)
+    monkeypatch.setattr(app_module, "calendars", registry)
+    return app_module.app.test_client(), registry.get("default").store
+
+
+def store_flexible(store, title, priority, start, minutes, earliest_start, deadline):
+    event = Event(
+        id=store.next_id(), title=title, priority=priority, type="flexible_without_preferred_time",
+        start=start, end=start + timedelta(minutes=minutes),
+        flexibility=Flexibility(earliest_start, deadline, minutes)
+    )
+    store.add(event)
+    return event
+
+
+def reschedule(client, mode):
+    return client.post("/reschedule", json={
+        "start_date": "2027-01-04T00:00:00", "end_date": "2027-01-04T23:59:59", "mode": mode
+    }).get_json()
+
+
+@pytest.mark.parametrize("mode", ["greedy", "solver"])
+def test_unplaced_events_are_kept(client, mode):
+    client, store = client
+    nine, ten = datetime(2027, 1, 4, 9), datetime(2027, 1, 4, 10)
+    # Two hour-long events that only fit 09:00-10:00, stored overlapping
+    high = store_flexible(store, "A", "high", nine, 60, nine, ten)
+    low = store_flexible(store, "B", "low", nine, 60, nine, ten)
+
+    result = reschedule(client, mode)
+    assert result["success"] == 1
+    assert [event["id"] for event in result["failed_events"]] == [low.id]
+
+    events = {event["id"]: event for event in client.get("/events").get_json()}
+    assert events[high.id]["start"] == "2027-01-04T09:00:00"
+    assert "start" not in events[low.id]
+
+    # Once there is room, a later reschedule places it again
+    client.delete(f"/events/{high.id}")
+    assert reschedule(client, mode)["success"] == 1
+    assert client.get(f"/events?start={nine.isoformat()}&end={ten.isoformat()}").get_json()[0]["id"] == low.id
+
+
+def test_unplaced_event_keeps_its_free_slot(client):
+    client, store = client
+    nine, eleven = datetime(2027, 1, 4, 9), datetime(2027, 1, 4, 11)
+    # Its window is too short for it, but nothing else wants its slot
+    event = store_flexible(store, "Long", "medium", nine, 120, nine, datetime(2027, 1, 4, 10))
+
+    result = reschedule(client, "greedy")
+    assert result["failed"] == 1
+    stored = client.get("/events").get_json()[0]
+    assert (stored["id"], stored["start"], stored["end"]) == (event.id, nine.isoformat(), eleven.isoformat())
+
+
+def test_async_job_sees_writes_of_other_workers(monkeypatch, tmp_path):
+    database = str(tmp_path / "events.db")
+    registry = CalendarRegistry(database)
+    monkeypatch.setattr(app_module, "calendars", registry)
+    calendar = registry.get("default")
+    nine, noon = datetime(2027, 1, 4, 9), datetime(2027, 1, 4, 12)
+    kept = store_flexible(calendar.store, "A", "high", nine, 60, nine, noon)
+    deleted = store_flexible(calendar.store, "B", "low", nine + timedelta(hours=1), 60, nine, noon)
+    # Another worker process, writing the same calendar through its own store
+    other = SQLiteStore(database)
+
+    plan = app_module.plan_reschedule
+    attempts = []
+
+    def plan_while_another_worker_deletes(*args):
+        attempts.append(args)
+        if len(attempts) == 1:
+            other.remove(deleted.id)
+        return plan(*args)
+    monkeypatch.setattr(app_module, "plan_reschedule", plan_while_another_worker_deletes)
+
+    job = SimpleNamespace(progress=None)
+    result = app_module.run_reschedule_job(
+        job, calendar, datetime(2027, 1, 4), datetime(2027, 1, 4, 23, 59, 59), "greedy", 1000
+    )
+    assert len(attempts) == 2
+    assert result["success"] == 1
+    assert [event.id for event in calendar.store.all()] == [kept.id]
+
+
+@pytest.mark.parametrize("mode", ["greedy", "solver"])
+def test_instances_left_in_place_keep_their_ids(client, mode):
+    client, store = client
+    client.post("/events", json={
+        "title": "Busy", "priority": "high", "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:00:00"
+    })
+    # The series' 09:00 occurrence on the 4th moves to a stored instance
+    client.post("/events", json={
+        "title": "Daily", "priority": "low", "type": "recurring_without_preferred_time",
+        "duration": 30, "frequency": 1, "start_date": "2027-01-03T09:00:00", "end_date": "2027-01-05T09:00:00"
+    })
+    instance = next(event for event in store.all() if event.type == "recurring_instance")
+    version = client.get("/events/changes?since=0").get_json()["version"]
+
+    result = reschedule(client, mode)
+    assert result["success"] == 1
+    moved = next(event for event in store.all() if event.type == "recurring_instance")
+    assert (moved.id, moved.start) == (instance.id, instance.start)
+    changed = client.get(f"/events/changes?since={version}").get_json()["changes"]
+    assert instance.id not in [change["id"] for change in changed]
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+from models import Event
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    def use(database=None):
+        path = str(tmp_path / "events.db") if database else None
+        monkeypatch.setattr(app_module, "calendars", CalendarRegistry(path))
+        return app_module.app.test_client(), path
+    return use
+
+
+def add_event(client, hour):
+    response = client.post("/events", json={
+        "title": f"Event {hour}", "priority": "high", "type": "fixed",
+        "start": f"2027-01-04T{hour:02d}:00:00", "end": f"2027-01-04T{hour:02d}:30:00"
+    })
+    assert response.status_code == 201
+
+
+def test_not_modified_until_a_write(client):
+    client, _ = client()
+    add_event(client, 9)
+    first = client.get("/events")
+    etag = first.headers["ETag"]
+    assert client.get("/events").data == first.data
+
+    assert client.get("/events", headers={"If-None-Match": etag}).status_code == 304
+    add_event(client, 11)
+    changed = client.get("/events", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.get_json()) == 2
+
+
+def test_writes_from_another_worker_change_the_etag(client):
+    client, path = client(database=True)
+    add_event(client, 9)
+    first = client.get("/events")
+    etag = first.headers["ETag"]
+
+    # A second registry on the same file stands in for another worker process
+    other = CalendarRegistry(path).get("default").store
+    other.add(Event(
+        id=other.next_id(), title="Elsewhere", priority="low", type="fixed",
+        start=datetime(2027, 1, 4, 14), end=datetime(2027, 1, 4, 15)
+    ))
+
+    changed = client.get("/events", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [event["title"] for event in changed.get_json()] == ["Event 9", "Elsewhere"]
+    assert client.get("/events").data == changed.data
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from slots import BusyTimeline
+
+STEP = timedelta(minutes=15)
+HALF_HOUR = timedelta(minutes=30)
+
+
+def test_slots_on_the_step_grid():
+    nine = datetime(2027, 1, 4, 9)
+    timeline = BusyTimeline([(nine + timedelta(minutes=10), nine + timedelta(minutes=50))])
+    slots = timeline.find_slots(nine, nine + timedelta(hours=2), HALF_HOUR, STEP)
+    assert [start.time().isoformat() for start, _ in slots] == ["10:00:00", "10:15:00", "10:30:00"]
+
+
+def test_slots_up_to_datetime_max():
+    start = datetime.max - timedelta(hours=1)
+    slots = BusyTimeline().find_slots(start, datetime.max, HALF_HOUR, STEP)
+    assert [slot_start for slot_start, _ in slots] == [start + STEP * n for n in range(3)]
+    # A grid point past the last representable time yields nothing
+    late = datetime.max - timedelta(minutes=1)
+    assert BusyTimeline().find_slots(late, datetime.max, HALF_HOUR, STEP, anchor=late - timedelta(minutes=1)) == []
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from slots import BusyTimeline
+from solver import Solver, Task
+
+STEP = timedelta(minutes=15)
+HOUR = timedelta(hours=1)
+
+
+def at(hour, minute=0):
+    return datetime(2027, 1, 4, hour, minute)
+
+
+def task(earliest, deadline, weight=1, hours=1, preferred=()):
+    return Task(hours * HOUR, at(earliest), at(deadline), weight, list(preferred))
+
+
+def solver(tasks, busy=(), budget=1.0):
+    return Solver(BusyTimeline(busy), tasks, STEP, budget)
+
+
+def test_solve_prefers_the_heavier_task():
+    # Both only fit 09:00-10:00
+    solution = solver([task(9, 10), task(9, 10, weight=3)]).solve()
+    assert solution.slots == {1: (at(9), at(10))}
+    assert solution.objective() == {"placed": 1, "weighted_priority": 3}
+
+
+def test_repair_keeps_placements_that_need_not_move():
+    tasks = [task(9, 17), task(9, 17)]
+    solution = solver(tasks).repair({0: (at(14), at(15))})
+    assert solution.slots == {0: (at(14), at(15)), 1: (at(9), at(10))}
+    assert not solution.timed_out
+
+
+def test_repair_moves_a_placement_to_fit_a_new_task():
+    # The new task only fits where task 0 sits; task 0 can go to 10:00 instead
+    tasks = [task(9, 11), task(9, 10, weight=3)]
+    solution = solver(tasks, busy=[(at(11), at(12))]).repair({0: (at(9), at(10))})
+    assert solution.slots == {0: (at(10), at(11)), 1: (at(9), at(10))}
+    assert solution.weighted == 4
+
+
+def test_repair_leaves_out_a_task_that_cannot_fit():
+    tasks = [task(9, 10, weight=3), task(9, 10)]
+    solution = solver(tasks).repair({0: (at(9), at(10))})
+    assert solution.slots == {0: (at(9), at(10))}
+    assert solution.placed == 1
+
+
+def test_repair_stops_when_the_budget_runs_out():
+    solution = solver([task(9, 17)], budget=-1).repair({})
+    assert solution.slots == {}
+    assert solution.timed_out
+
+
+def test_compact_moves_tasks_into_earlier_free_time():
+    tasks = [task(9, 17), task(9, 17)]
+    solution = solver(tasks, busy=[(at(9), at(10))]).compact(
+        {0: (at(12), at(13)), 1: (at(15), at(16))}
+    )
+    assert solution.slots == {0: (at(10), at(11)), 1: (at(11), at(12))}
+
+
+def test_compact_moves_a_task_into_its_preferred_window():
+    tasks = [task(9, 17, preferred=[(at(14), at(16))])]
+    solution = solver(tasks).compact({0: (at(9), at(10))})
+    assert solution.slots == {0: (at(14), at(15))}
+
+    # Already inside the window, an earlier slot outside it ranks worse
+    solution = solver(tasks).compact({0: (at(15), at(16))})
+    assert solution.slots == {0: (at(14), at(15))}
+
+
+def test_compact_gives_freed_time_to_the_heavier_task_first():
+    tasks = [task(9, 17), task(9, 17, weight=3)]
+    solution = solver(tasks, busy=[(at(10), at(12))]).compact(
+        {0: (at(12), at(13)), 1: (at(13), at(14))}
+    )
+    assert solution.slots == {0: (at(12), at(13)), 1: (at(9), at(10))}
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+from calendars import CalendarRegistry
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "calendars", CalendarRegistry())
+    client = app_module.app.test_client()
+    client.post("/events", json={
+        "title": "Focus", "priority": "high", "start": "2027-01-04T09:00:00", "end": "2027-01-04T10:30:00"
+    })
+    return client
+
+
+def test_range_of_weeks(client):
+    body = client.get("/statistics?range=2026-W53..2027-W02").get_json()
+    assert body["week_start"] == "2026-12-28T00:00:00"
+    assert body["week_end"] == "2027-01-18T00:00:00"
+    assert body["event_durations"] == {"Focus": 90}
+
+
+@pytest.mark.parametrize("query", [
+    "range=0001-W01..9999-W52",
+    "range=2000-W01..2020-W01",
+    "range=2027-W02..2027-W01",
+    "week=9999-W52",
+    "range=2027-W01",
+    "week=2027-W60"
+])
+def test_invalid_ranges_are_rejected(client, query):
+    assert client.get(f"/statistics?{query}").status_code == 400
+
+
+def iso_week(moment):
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def test_range_at_the_cap(client):
+    first = datetime(2020, 1, 6)
+    last = first + timedelta(weeks=app_module.MAX_STATISTICS_WEEKS - 1)
+    assert client.get(f"/statistics?range={iso_week(first)}..{iso_week(last)}").status_code == 200
+    last += timedelta(weeks=1)
+    assert client.get(f"/statistics?range={iso_week(first)}..{iso_week(last)}").status_code == 400
@@ -0,0 +1,107 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Event
+from storage import MemoryStore, SQLiteStore
+
+
+def make_event(store, start, hours=1):
+    return Event(
+        id=store.next_id(), title="Event", priority="medium", type="fixed",
+        start=start, end=start + timedelta(hours=hours)
+    )
+
+
+def fail_begin_once(store, error):
+    begin = store._begin
+
+    def failing_begin():
+        store._begin = begin
+        raise error
+    store._begin = failing_begin
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "events.db"))
+
+
+def test_failed_begin_leaves_no_open_transaction(store):
+    heard = []
+    store.subscribe(lambda op, event: heard.append(op))
+    fail_begin_once(store, sqlite3.OperationalError("database is locked"))
+
+    with pytest.raises(sqlite3.OperationalError):
+        with store.transaction():
+            pass
+    assert store._depth == 0
+
+    event = make_event(store, datetime(2027, 1, 4, 9))
+    store.add(event)
+    assert heard == ["created"]
+    assert store.get(event.id) == event
+
+
+def test_failed_begin_does_not_hold_the_database(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = SQLiteStore(path)
+    fail_begin_once(store, sqlite3.OperationalError("database is locked"))
+    with pytest.raises(sqlite3.OperationalError):
+        with store.transaction():
+            pass
+
+    event = make_event(store, datetime(2027, 1, 4, 9))
+    store.add(event)
+    other = sqlite3.connect(path)
+    try:
+        assert other.execute("SELECT title FROM events WHERE id = ?", (event.id,)).fetchall() == [("Event",)]
+        # Nothing is left holding the write lock
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+    finally:
+        other.close()
+
+
+def test_nested_transactions_notify_once_outermost_ends(store):
+    heard = []
+    store.subscribe(lambda op, event: heard.append(op))
+    with store.transaction():
+        store.add(make_event(store, datetime(2027, 1, 4, 9)))
+        with store.transaction():
+            store.add(make_event(store, datetime(2027, 1, 4, 11)))
+        assert heard == []
+    assert heard == ["created", "created"]
+
+
+def test_sqlite_span_shrinks_when_the_longest_event_goes(tmp_path):
+    store = SQLiteStore(str(tmp_path / "events.db"))
+    other = SQLiteStore(str(tmp_path / "events.db"), "other")
+    start = datetime(2027, 1, 4, 9)
+    short = make_event(store, start)
+    long = make_event(store, start, hours=24 * 30)
+    store.add(short)
+    store.add(long)
+    other.add(make_event(other, start, hours=3))
+    assert store._max_span() > timedelta(days=29)
+
+    # Shortening the longest event recomputes the bound from the whole file
+    long.end = long.start + timedelta(hours=2)
+    store.add(long)
+    assert timedelta(hours=3) < store._max_span() <= timedelta(hours=3, seconds=2)
+
+    other.remove(other.all()[0].id)
+    assert timedelta(hours=2) < store._max_span() <= timedelta(hours=2, seconds=2)
+    store.remove(short.id)
+    assert timedelta(hours=2) < store._max_span() <= timedelta(hours=2, seconds=2)
+    assert [event.id for event in store.overlapping(start + timedelta(hours=1), start + timedelta(hours=3))] == [long.id]
+
+
+def test_pages_reaching_datetime_min(store):
+    event = make_event(store, datetime(2027, 1, 4, 9))
+    store.add(event)
+    assert [found.id for found in store.page(datetime.min, datetime.max, limit=10)] == [event.id]
+    assert store.page(datetime.min, datetime.min + timedelta(days=1)) == []
@@ -0,0 +1,37 @@
+from datetime import date, datetime, time
+
+from timeutils import TimeWindow, parse_preferred_time
+
+
+def at(day, hour, minute=0):
+    return datetime(2027, 1, day, hour, minute)
+
+
+def test_daytime_window():
+    window = parse_preferred_time("09:00-12:00")
+    assert not window.overnight
+    assert window.on(date(2027, 1, 4)) == (at(4, 9), at(4, 12))
+    assert list(window.between(at(4, 10), at(6, 9))) == [(at(4, 10), at(4, 12)), (at(5, 9), at(5, 12))]
+
+
+def test_overnight_window_ends_the_next_day():
+    window = parse_preferred_time("22:00-02:00")
+    assert window.overnight
+    assert window.on(date(2027, 1, 4)) == (at(4, 22), at(5, 2))
+    # The window opened the day before is still running at the start
+    assert list(window.between(at(4, 1), at(5, 23))) == [
+        (at(4, 1), at(4, 2)), (at(4, 22), at(5, 2)), (at(5, 22), at(5, 23))
+    ]
+    assert list(window.between(at(4, 3), at(4, 21))) == []
+
+
+def test_windows_at_the_datetime_limits():
+    window = TimeWindow(time(22), time(2))
+    assert window.on(date.max) == (datetime(9999, 12, 31, 22), datetime.max)
+    assert list(window.between(datetime.min, datetime(1, 1, 3))) == [
+        (datetime.min, datetime(1, 1, 1, 2)), (datetime(1, 1, 1, 22), datetime(1, 1, 2, 2)),
+        (datetime(1, 1, 2, 22), datetime(1, 1, 3))
+    ]
+    assert list(window.between(datetime(9999, 12, 31, 1), datetime.max)) == [
+        (datetime(9999, 12, 31, 1), datetime(9999, 12, 31, 2)), (datetime(9999, 12, 31, 22), datetime.max)
+    ]
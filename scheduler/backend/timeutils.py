@@ -0,0 +1,112 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+
+from metrics import DATETIME_PARSES
+
+FRACTION = re.compile(r"\.\d+")
+
+
+def parse_datetime(date_string):
+    """Parse an ISO 8601 datetime into a naive UTC datetime.
+
+    Times with 'Z' or an offset are converted to UTC; naive times are taken
+    to be UTC already. Fractional seconds are dropped. Datetimes parsed
+    beforehand, like those of imported events, are passed through.
+    """
+    if not date_string:
+        return None
+    if isinstance(date_string, datetime):
+        return date_string
+    DATETIME_PARSES.inc()
+    if not isinstance(date_string, str):
+        raise ValueError(f"Invalid datetime format: {date_string}")
+    return _parse_datetime(date_string)
+
+
+@lru_cache(maxsize=4096)
+def _parse_datetime(date_string):
+    try:
+        value = datetime.fromisoformat(date_string)
+    except ValueError:
+        # Before Python 3.11, fromisoformat takes neither 'Z' nor arbitrary fractions
+        normalized = FRACTION.sub("", date_string)
+        if normalized[-1:] in ("Z", "z"):
+            normalized = normalized[:-1] + "+00:00"
+        try:
+            value = datetime.fromisoformat(normalized)
+        except ValueError:
+            raise ValueError(f"Invalid datetime format: {date_string}") from None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=0)
+
+
+def utc_now():
+    """The current time as a naive UTC datetime, comparable with parsed ones."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def format_datetime(value):
+    """Serialize a datetime for JSON responses; None stays None."""
+    return value.isoformat() if value else None
+
+
+class TimeWindow(NamedTuple):
+    """A daily time-of-day window such as 09:00-12:00.
+
+    A window whose end is not after its start, such as 22:00-02:00, runs
+    overnight into the next day.
+    """
+
+    start: time
+    end: time
+
+    @property
+    def overnight(self):
+        return self.end <= self.start
+
+    def on(self, day):
+        """The window starting on a date, as (start, end) datetimes."""
+        start, end = datetime.combine(day, self.start), datetime.combine(day, self.end)
+        if self.overnight:
+            end = end + timedelta(days=1) if day < date.max else datetime.max
+        return start, end
+
+    def between(self, earliest, latest):
+        """Yield the non-empty daily windows that meet [earliest, latest), clipped to it."""
+        day = earliest.date()
+        if self.overnight:
+            # The window of the day before may still be open
+            end = min(datetime.combine(day, self.end), latest)
+            if earliest < end:
+                yield earliest, end
+        while True:
+            start, end = self.on(day)
+            start, end = max(start, earliest), min(end, latest)
+            if start < end:
+                yield start, end
+            if day >= latest.date():
+                break
+            day += timedelta(days=1)
+
+
+def parse_preferred_time(preferred_time):
+    """Parse a preferred time 'HH:MM - HH:MM' into a TimeWindow; empty gives None."""
+    if not preferred_time:
+        return None
+    if not isinstance(preferred_time, str):
+        raise ValueError(f"Invalid preferred time format: {preferred_time}")
+    return _parse_preferred_time(preferred_time)
+
+
+@lru_cache(maxsize=1024)
+def _parse_preferred_time(preferred_time):
+    try:
+        start_time, end_time = preferred_time.split("-")
+        start = datetime.strptime(start_time.strip(), "%H:%M").time()
+        end = datetime.strptime(end_time.strip(), "%H:%M").time()
+        return TimeWindow(start, end)
+    except ValueError:
+        raise ValueError(f"Invalid preferred time format: {preferred_time}") from None
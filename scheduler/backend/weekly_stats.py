@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+
+def start_of_week(moment):
+    """Return midnight on the Monday of moment's ISO week."""
+    monday = moment - timedelta(days=moment.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_week(text):
+    """Parse an ISO week such as '2026-W42' into the datetime its week starts at."""
+    try:
+        return datetime.strptime(f"{text.strip()}-1", "%G-W%V-%u")
+    except (ValueError, AttributeError):
+        raise ValueError(f"Invalid ISO week: {text}")
+
+
+class WeeklyStats:
+    """Event duration totals per (ISO week, title), kept current from store changes.
+
+    Each event's contribution is remembered so updates and deletes can be
+    subtracted again; a statistics query only touches the requested weeks.
+    A recurring parent contributes its occurrences at their nominal slots,
+    while moved occurrences are counted through their stored instances.
+    """
+
+    def __init__(self):
+        self._weeks = {}
+        self._contributions = {}
+
+    def load(self, events):
+        for event in events:
+            self.record("created", event)
+
+    def record(self, op, event):
+        """Store listener: fold one created, updated or deleted event into the totals."""
+        self._retract(event.id)
+        if op == "deleted":
+            return
+        if event.recurrence is not None:
+            slots = event.recurrence.occurrences(*event.recurrence.span())
+            intervals = [(slot_start, slot_end) for _, slot_start, slot_end in slots]
+        elif event.is_timed:
+            intervals = [(event.start, event.end)]
+        else:
+            return
+
+        per_week = {}
+        for start, end in intervals:
+            week = start.isocalendar()[:2]
+            per_week[week] = per_week.get(week, 0) + (end - start).total_seconds()
+        for week, seconds in per_week.items():
+            totals = self._weeks.setdefault(week, {})
+            totals[event.title] = totals.get(event.title, 0) + seconds
+        self._contributions[event.id] = (event.title, per_week)
+
+    def _retract(self, event_id):
+        contribution = self._contributions.pop(event_id, None)
+        if contribution is None:
+            return
+        title, per_week = contribution
+        for week, seconds in per_week.items():
+            totals = self._weeks[week]
+            remaining = totals[title] - seconds
+            if remaining > 0:
+                totals[title] = remaining
+            else:
+                del totals[title]
+                if not totals:
+                    del self._weeks[week]
+
+    def durations(self, week_start, week_end):
+        """Return minutes per title for the weeks in [week_start, week_end), longest first."""
+        minutes = {}
+        current = week_start
+        while current < week_end:
+            for title, seconds in self._weeks.get(current.isocalendar()[:2], {}).items():
+                minutes[title] = minutes.get(title, 0) + seconds / 60
+            current += timedelta(days=7)
+        return dict(sorted(minutes.items(), key=lambda x: x[1], reverse=True))
@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+
+from timeutils import format_datetime
+
+# Share of each event kind in a generated calendar
+DEFAULT_MIX = {"fixed": 0.6, "recurring": 0.02, "flexible": 0.38}
+PRIORITIES = ("high", "medium", "low")
+DURATIONS = (15, 30, 45, 60, 90, 120)
+PREFERRED_TIMES = ("09:00-12:00", "13:00-17:00", "08:00-10:00", "15:00-18:00")
+
+
+def parse_mix(text):
+    """Parse 'fixed=0.6,recurring=0.02,flexible=0.38' into an event mix."""
+    mix = {}
+    for part in text.split(","):
+        kind, _, share = part.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"Unknown event kind: {kind}")
+        mix[kind] = float(share)
+    return mix
+
+
+class WorkloadGenerator:
+    """Reproducible POST /events payloads for synthetic calendars.
+
+    Events are spread over working hours at ``events_per_day``, so a
+    calendar's span grows with its size. The same seed always yields the same
+    payloads, which keeps benchmark runs comparable.
+    """
+
+    def __init__(self, start=datetime(2027, 1, 4), events_per_day=8, mix=None,
+                 preferred_share=0.5, seed=0):
+        self.start = start
+        self.events_per_day = events_per_day
+        self.mix = mix or DEFAULT_MIX
+        self.preferred_share = preferred_share
+        self.random = random.Random(seed)
+
+    def days_for(self, count):
+        return max(1, count // self.events_per_day)
+
+    def moment(self, days):
+        """A random time on the 15 minute grid inside working hours of the first ``days`` days."""
+        day = self.random.randrange(days)
+        minutes = self.random.randrange(8 * 4, 18 * 4) * 15
+        return self.start + timedelta(days=day, minutes=minutes)
+
+    def event(self, days):
+        kinds = list(self.mix)
+        kind = self.random.choices(kinds, weights=[self.mix[k] for k in kinds])[0]
+        preferred = self.random.random() < self.preferred_share
+        data = {
+            "title": f"{kind}-{self.random.randrange(50)}",
+            "priority": self.random.choice(PRIORITIES)
+        }
+        duration = self.random.choice(DURATIONS)
+
+        if kind == "fixed":
+            start = self.moment(days)
+            data.update(
+                type="fixed",
+                start=format_datetime(start),
+                end=format_datetime(start + timedelta(minutes=duration))
+            )
+        elif kind == "recurring":
+            start = self.moment(days)
+            data.update(
+                type="recurring_with_preferred_time" if preferred else "recurring_without_preferred_time",
+                duration=str(duration),
+                frequency=str(self.random.choice((1, 2, 7))),
+                start_date=format_datetime(start),
+                end_date=format_datetime(start + timedelta(days=28))
+            )
+        else:
+            earliest = self.moment(days)
+            data.update(
+                type="flexible_with_preferred_time" if preferred else "flexible_without_preferred_time",
+                duration=str(duration),
+                earliest_start=format_datetime(earliest),
+                deadline=format_datetime(earliest + timedelta(days=self.random.randint(1, 5)))
+            )
+        if preferred:
+            data["preferred_time"] = self.random.choice(PREFERRED_TIMES)
+        return data
+
+    def events(self, count, days=None):
+        """Return count payloads spread over ``days`` (default: sized for count)."""
+        days = days or self.days_for(count)
+        return [self.event(days) for _ in range(count)]
+
+    def window(self, days, length):
+        """A random [start, end) range of the given length inside the calendar."""
+        start = self.start + timedelta(days=self.random.randrange(days))
+        return start, start + length
@@ -1,12 +1,37 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useRef } from "react";
 import FullCalendar from "@fullcalendar/react";
 import dayGridPlugin from "@fullcalendar/daygrid";
 import timeGridPlugin from "@fullcalendar/timegrid";
 import interactionPlugin from "@fullcalendar/interaction";
 import axios from "axios";
 
+const toLocalISOString = (date) => {
+  const pad = (value) => String(value).padStart(2, "0");
+  return (
+    `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}` +
+    `T${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(date.getSeconds())}`
+  );
+};
+
+const isSeriesChange = (change) =>
+  change.type.startsWith("recurring") && change.type !== "recurring_instance";
+
+const applyChanges = (currentEvents, changes) => {
+  const byId = new Map(currentEvents.map((event) => [event.id, event]));
+  changes.forEach((change) => {
+    if (change.op === "deleted") {
+      byId.delete(change.id);
+    } else {
+      byId.set(change.id, change.event);
+    }
+  });
+  return Array.from(byId.values());
+};
+
 const Calendar = () => {
   const [events, setEvents] = useState([]);
+  const syncState = useRef({ version: null, log: null });
+  const visibleRange = useRef(null);
   const [activeForm, setActiveForm] = useState(null);
   const [statistics, setStatistics] = useState(null);
   const [formData, setFormData] = useState({
@@ -24,16 +49,46 @@ const Calendar = () => {
 
   const fetchEvents = async () => {
     try {
-      const response = await axios.get("http://localhost:5000/events");
+      // Recurring occurrences are only expanded for a range, so ask for the visible one
+      const response = await axios.get("http://localhost:5000/events", {
+        params: visibleRange.current || {},
+      });
+      syncState.current = {
+        version: Number(response.headers["x-events-version"]),
+        log: response.headers["x-events-log"],
+      };
       setEvents(response.data);
     } catch (error) {
       console.error("Error fetching events:", error);
     }
   };
 
-  useEffect(() => {
+  const syncEvents = async () => {
+    const { version, log } = syncState.current;
+    if (version === null || Number.isNaN(version)) {
+      return fetchEvents();
+    }
+    try {
+      const response = await axios.get("http://localhost:5000/events/changes", {
+        params: { since: version, log },
+      });
+      if (response.data.resync || response.data.changes.some(isSeriesChange)) {
+        return fetchEvents();
+      }
+      syncState.current = { version: response.data.version, log: response.data.log };
+      setEvents((currentEvents) => applyChanges(currentEvents, response.data.changes));
+    } catch (error) {
+      console.error("Error syncing events:", error);
+    }
+  };
+
+  const handleDatesSet = (dateInfo) => {
+    visibleRange.current = {
+      start: toLocalISOString(dateInfo.start),
+      end: toLocalISOString(dateInfo.end),
+    };
     fetchEvents();
-  }, []);
+  };
 
   const fetchStatistics = async () => {
     try {
@@ -61,7 +116,7 @@ const Calendar = () => {
         alert(`Successfully rescheduled ${response.data.success} events.`);
       }
       
-      fetchEvents();
+      syncEvents();
     } catch (error) {
       console.error("Error rescheduling events:", error);
       alert("Failed to reschedule events.");
@@ -98,8 +153,8 @@ const Calendar = () => {
         type: activeForm,
       };
 
-      const response = await axios.post("http://localhost:5000/events", eventData);
-      setEvents([...events, response.data]);
+      await axios.post("http://localhost:5000/events", eventData);
+      await syncEvents();
       alert("Event added successfully!");
       resetForm();
     } catch (error) {
@@ -116,7 +171,7 @@ const Calendar = () => {
     if (window.confirm(`Are you sure you want to delete '${clickInfo.event.title}'?`)) {
       try {
         await axios.delete(`http://localhost:5000/events/${clickInfo.event.id}`);
-        await fetchEvents();
+        await syncEvents();
         alert("Event deleted successfully!");
       } catch (error) {
         console.error("Error deleting event:", error);
@@ -336,6 +391,7 @@ const Calendar = () => {
           selectable={true}
           height="auto"
           eventClick={handleEventClick}
+          datesSet={handleDatesSet}
         />
       </div>
 